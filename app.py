@@ -4,12 +4,14 @@ AI-Based Diabetes Risk Prediction using Machine Learning
 """
 
 import streamlit as st
-import pandas as pd
 import numpy as np
-import pickle
-import plotly.graph_objects as go
-import plotly.express as px
+import os
 from datetime import datetime
+import csv
+import io
+from instrumentation import export_if_due, sampled_profile, serve_metrics, timed, timer, trace
+from prediction_cache import PredictionCache
+from warmup import Warmup
 
 # Page configuration
 st.set_page_config(
@@ -59,19 +61,62 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+def build_model_registry():
+    """Registry that swaps in retrained models without a restart"""
+    # Imported on first use, so the header paints before sklearn is loaded
+    from inference_server import load_remote_model, remote_artifact_hash
+    from model_registry import ModelRegistry
+    
+    # Score through the REST service instead when one is configured
+    service_url = os.environ.get('PREDICTION_SERVICE_URL')
+    if service_url:
+        # Poll the service's artifact hash, so its reloads and rollbacks reach the app
+        return ModelRegistry(loader=lambda: load_remote_model(service_url), watch_paths=(),
+                             signature=lambda: remote_artifact_hash(service_url), max_wait_ms=0)
+    # One script run scores one row at a time: never hold it back for a batch to fill
+    return ModelRegistry(max_wait_ms=0)
+
 @st.cache_resource
+def get_warmup():
+    """Load, check and exercise the model in the background, once per server
+
+    Streamlit runs this script only once a browser session connects, so the
+    first visitor after a (re)start starts the warm-up and may wait for it;
+    later sessions find the model ready.
+    """
+    # No chart priming: it would import plotly.express before the first page renders
+    return Warmup(build_model_registry)
+
+def get_model_registry():
+    """The warmed-up registry, waiting for warm-up if it is still running"""
+    warmup = get_warmup()
+    if not warmup.ready.is_set():
+        with st.spinner("Loading model..."):
+            warmup.registry()
+    registry = warmup.registry()
+    if registry is None:
+        # Drop the failed warm-up so the next rerun tries again (e.g. the service was down)
+        get_warmup.clear()
+        st.error(f"⚠️ Could not load the model: {warmup.error}")
+        st.stop()
+    return registry
+
+@timed('load_model')
 def load_model():
-    """Load the trained model and scaler"""
-    try:
-        with open('diabetes_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-        with open('scaler.pkl', 'rb') as f:
-            scaler = pickle.load(f)
-        with open('model_info.pkl', 'rb') as f:
-            model_info = pickle.load(f)
-        return model, scaler, model_info
-    except FileNotFoundError:
-        return None, None, None
+    """Current model version (model, scaler, info and a shared micro-batcher), or None"""
+    registry = get_model_registry()
+    return registry.current() if registry is not None else None
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Serve stage timings for Prometheus on $METRICS_PORT, if set"""
+    port = os.environ.get('METRICS_PORT')
+    return serve_metrics(int(port)) if port else None
+
+@st.cache_resource
+def get_prediction_cache():
+    """Results of recent inputs, shared across sessions and reruns"""
+    return PredictionCache()
 
 def get_risk_level(probability):
     """Determine risk level based on probability"""
@@ -82,8 +127,19 @@ def get_risk_level(probability):
     else:
         return "High Risk", "#ef5350", "😟"
 
+def create_report_csv(report_data):
+    """Render a one-row report as CSV text"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(report_data), lineterminator='\n')
+    writer.writeheader()
+    writer.writerow(report_data)
+    return buffer.getvalue()
+
+@timed('chart.gauge')
 def create_gauge_chart(probability):
     """Create a gauge chart for risk visualization"""
+    import plotly.graph_objects as go
+    
     fig = go.Figure(go.Indicator(
         mode="gauge+number+delta",
         value=probability * 100,
@@ -116,8 +172,11 @@ def create_gauge_chart(probability):
     
     return fig
 
+@timed('chart.features')
 def create_feature_importance_chart(user_data):
     """Create a bar chart showing user's input values"""
+    import plotly.express as px
+    
     features = ['Pregnancies', 'Glucose', 'Blood Pressure', 'Skin Thickness', 
                 'Insulin', 'BMI', 'Pedigree Function', 'Age']
     values = list(user_data.values())
@@ -179,12 +238,13 @@ def main():
     st.markdown('<p class="main-header">🏥 AI-Based Diabetes Prediction System</p>', unsafe_allow_html=True)
     
     # Load model
-    model, scaler, model_info = load_model()
+    model_version = load_model()
     
-    if model is None:
+    if model_version is None:
         st.error("⚠️ Model not found! Please run 'train_model.py' first to train the model.")
         st.info("Run the following command in your terminal:\n```\npython train_model.py\n```")
         return
+    model_info = model_version.model_info
     
     # Sidebar - Model Information
     with st.sidebar:
@@ -202,6 +262,10 @@ def main():
         st.metric("Recall", f"{model_info['recall']*100:.2f}%")
         st.metric("F1-Score", f"{model_info['f1_score']*100:.2f}%")
         
+        cache_stats = get_prediction_cache().stats()
+        st.caption(f"Prediction cache: {cache_stats['hit_rate']*100:.0f}% hit rate "
+                   f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})")
+        
         st.markdown("---")
         st.markdown("### How to Use")
         st.markdown(
@@ -303,18 +367,14 @@ def main():
             'Age': age
         }
         
-        # Create dataframe
-        input_df = pd.DataFrame([list(user_data.values())], 
-                                columns=['Pregnancies', 'Glucose', 'BloodPressure', 
-                                        'SkinThickness', 'Insulin', 'BMI', 
-                                        'DiabetesPedigreeFunction', 'Age'])
-        
-        # Scale input
-        input_scaled = scaler.transform(input_df)
+        # Feature row in model order (user_data keys follow FEATURE_COLUMNS)
+        input_row = np.fromiter(user_data.values(), dtype=np.float64, count=len(user_data))
         
-        # Make prediction
-        prediction = model.predict(input_scaled)[0]
-        probability = model.predict_proba(input_scaled)[0][1]
+        # Reuse the result for a repeated input; otherwise scale and predict
+        # (batched with concurrent sessions)
+        with timer('inference'):
+            prediction, probability = get_prediction_cache().predict(
+                input_row, model_version.sha256, model_version.batcher.predict)
         
         # Display results
         st.markdown("---")
@@ -362,12 +422,11 @@ def main():
             **user_data
         }
         
-        report_df = pd.DataFrame([report_data])
-        csv = report_df.to_csv(index=False)
+        report_csv = create_report_csv(report_data)
         
         st.download_button(
             label="📥 Download Report as CSV",
-            data=csv,
+            data=report_csv,
             file_name=f"diabetes_prediction_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
             mime="text/csv",
             use_container_width=True
@@ -384,4 +443,10 @@ def main():
     )
 
 if __name__ == "__main__":
-    main()
+    start_metrics_endpoint()
+    # PROFILE_RATE=0.05 profiles 5% of reruns into profiles/
+    with sampled_profile('rerun'), trace() as spans, timer('rerun'):
+        main()
+    if os.environ.get('SHOW_TIMINGS'):
+        st.sidebar.caption(" · ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in spans))
+    export_if_due()
@@ -9,15 +9,19 @@ Features:
 """
 
 import streamlit as st
-import pandas as pd
 import numpy as np
-import pickle
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime
-import json
+import csv
+import io
+from downsample import MAX_CHART_POINTS
+from history_export import FORMATS as EXPORT_FORMATS, export_user
+from instrumentation import export_if_due, sampled_profile, serve_metrics, timed, timer, trace
+from page_fragments import build_fragments
+from prediction_cache import PredictionCache
+from warmup import Warmup
 import os
-import hashlib
+from auth import Authenticator
+from history_store import open_history_store
 
 # Page configuration
 st.set_page_config(
@@ -177,7 +181,9 @@ TRANSLATIONS = {
 
 # User database file
 USER_DB_FILE = 'users.json'
-HISTORY_DB_FILE = 'prediction_history.json'
+
+# Choices for the history table's page size
+HISTORY_PAGE_SIZES = [25, 50, 100]
 
 # Custom CSS
 st.markdown("""
@@ -222,80 +228,113 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def load_users():
-    """Load user database"""
-    if os.path.exists(USER_DB_FILE):
-        with open(USER_DB_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    """Save user database"""
-    with open(USER_DB_FILE, 'w') as f:
-        json.dump(users, f)
-
-def load_history():
-    """Load prediction history"""
-    if os.path.exists(HISTORY_DB_FILE):
-        with open(HISTORY_DB_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_history(history):
-    """Save prediction history"""
-    with open(HISTORY_DB_FILE, 'w') as f:
-        json.dump(history, f)
+@st.cache_resource
+def get_authenticator():
+    """Password checks against a cached, mtime-invalidated user index"""
+    return Authenticator(USER_DB_FILE)
 
-def hash_password(password):
-    """Hash password for security"""
-    return hashlib.sha256(password.encode()).hexdigest()
+@st.cache_resource
+def get_history_store():
+    """Open the prediction history store"""
+    return open_history_store()
 
+@timed('authenticate')
 def authenticate(username, password):
     """Authenticate user"""
-    users = load_users()
-    if username in users:
-        return users[username]['password'] == hash_password(password)
-    return False
+    return get_authenticator().authenticate(username, password)
 
 def create_user(username, password):
     """Create new user"""
-    users = load_users()
-    if username in users:
-        return False
-    users[username] = {'password': hash_password(password), 'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-    save_users(users)
-    return True
+    return get_authenticator().create_user(username, password)
 
+@timed('save_history')
 def add_prediction_to_history(username, prediction_data):
     """Add prediction to user's history"""
-    history = load_history()
-    if username not in history:
-        history[username] = []
-    
-    history[username].append({
+    get_history_store().append(username, {
         'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         'data': prediction_data
     })
-    save_history(history)
 
+@timed('load_history')
 def get_user_history(username):
     """Get user's prediction history"""
-    history = load_history()
-    return history.get(username, [])
+    return get_history_store().get_user_history(username)
+
+def build_model_registry():
+    """Registry that swaps in retrained models without a restart"""
+    # Imported here so the login page renders without sklearn
+    from inference_server import load_remote_model, remote_artifact_hash
+    from model_registry import ModelRegistry
+    
+    # Score through the REST service instead when one is configured
+    service_url = os.environ.get('PREDICTION_SERVICE_URL')
+    if service_url:
+        # Poll the service's artifact hash, so its reloads and rollbacks reach the app
+        return ModelRegistry(loader=lambda: load_remote_model(service_url), watch_paths=(),
+                             signature=lambda: remote_artifact_hash(service_url), max_wait_ms=0)
+    # One script run scores one row at a time: never hold it back for a batch to fill
+    return ModelRegistry(max_wait_ms=0)
+
+def prime_charts():
+    """Build a first figure so plotly's lazy setup is not paid by a user"""
+    from charts import gauge_chart
+    gauge_chart(0.5).to_json()
 
 @st.cache_resource
+def get_warmup():
+    """Load, check and exercise the model in the background, once per server
+
+    Streamlit runs this script only once a browser session connects, so the
+    first visitor after a (re)start starts the warm-up and may wait for it;
+    later sessions find the model ready.
+    """
+    return Warmup(build_model_registry, prime=[prime_charts])
+
+def get_model_registry():
+    """The warmed-up registry, waiting for warm-up if it is still running"""
+    warmup = get_warmup()
+    if not warmup.ready.is_set():
+        with st.spinner("Loading model..."):
+            warmup.registry()
+    registry = warmup.registry()
+    if registry is None:
+        # Drop the failed warm-up so the next rerun tries again (e.g. the service was down)
+        get_warmup.clear()
+        st.error(f"⚠️ Could not load the model: {warmup.error}")
+        st.stop()
+    return registry
+
+@timed('load_model')
 def load_model():
-    """Load the trained model and scaler"""
-    try:
-        with open('diabetes_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-        with open('scaler.pkl', 'rb') as f:
-            scaler = pickle.load(f)
-        with open('model_info.pkl', 'rb') as f:
-            model_info = pickle.load(f)
-        return model, scaler, model_info
-    except FileNotFoundError:
-        return None, None, None
+    """Current model version (model, scaler, info and a shared micro-batcher), or None"""
+    registry = get_model_registry()
+    return registry.current() if registry is not None else None
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Serve stage timings for Prometheus on $METRICS_PORT, if set"""
+    port = os.environ.get('METRICS_PORT')
+    return serve_metrics(int(port)) if port else None
+
+@st.cache_resource
+def get_prediction_cache():
+    """Results of recent inputs, shared across sessions and reruns"""
+    return PredictionCache()
+
+@st.cache_resource
+def get_page_fragments(lang):
+    """Static markdown for one language, built once per server"""
+    return build_fragments(TRANSLATIONS[lang])
+
+@timed('render.fragments')
+def render_fragments(sections):
+    """Render prebuilt markdown; a tuple of sections becomes side-by-side columns"""
+    for section in sections:
+        if isinstance(section, tuple):
+            for column, text in zip(st.columns(len(section)), section):
+                column.markdown(text, unsafe_allow_html=True)
+        else:
+            st.markdown(section, unsafe_allow_html=True)
 
 def get_risk_level(probability, lang='en'):
     """Determine risk level based on probability"""
@@ -307,66 +346,13 @@ def get_risk_level(probability, lang='en'):
     else:
         return t['high_risk'], "#ef5350", "😟"
 
-def create_gauge_chart(probability):
-    """Create a gauge chart for risk visualization"""
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number+delta",
-        value=probability * 100,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "Risk Score", 'font': {'size': 24}},
-        delta={'reference': 50},
-        gauge={
-            'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
-            'bar': {'color': "darkblue"},
-            'bgcolor': "white",
-            'borderwidth': 2,
-            'bordercolor': "gray",
-            'steps': [
-                {'range': [0, 30], 'color': '#e8f5e9'},
-                {'range': [30, 60], 'color': '#fff3e0'},
-                {'range': [60, 100], 'color': '#ffebee'}
-            ],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': 90
-            }
-        }
-    ))
-    
-    fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
-    return fig
-
-def create_history_chart(history_data):
-    """Create trend chart from history"""
-    if not history_data:
-        return None
-    
-    dates = [item['date'] for item in history_data]
-    probabilities = [item['data']['probability'] * 100 for item in history_data]
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=dates,
-        y=probabilities,
-        mode='lines+markers',
-        name='Risk %',
-        line=dict(color='#1f77b4', width=3),
-        marker=dict(size=10)
-    ))
-    
-    fig.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Low Risk Threshold")
-    fig.add_hline(y=60, line_dash="dash", line_color="red", annotation_text="High Risk Threshold")
-    
-    fig.update_layout(
-        title="Risk Trend Over Time",
-        xaxis_title="Date",
-        yaxis_title="Risk Probability (%)",
-        height=400,
-        hovermode='x unified'
-    )
-    
-    return fig
+def create_report_csv(report_data):
+    """Render a one-row report as CSV text"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(report_data), lineterminator='\n')
+    writer.writeheader()
+    writer.writerow(report_data)
+    return buffer.getvalue()
 
 def login_page(lang='en'):
     """Login/Signup page"""
@@ -410,17 +396,23 @@ def login_page(lang='en'):
 
 def main_app(lang='en'):
     """Main application after login"""
+    # Plotly and pandas are only needed once logged in
+    import pandas as pd
+    from charts import gauge_chart, history_chart
+    
     t = TRANSLATIONS[lang]
+    fragments = get_page_fragments(lang)
     
     # Header
     st.markdown(f'<p class="main-header">{t["title"]}</p>', unsafe_allow_html=True)
     
     # Load model
-    model, scaler, model_info = load_model()
+    model_version = load_model()
     
-    if model is None:
+    if model_version is None:
         st.error("⚠️ Model not found! Please run 'train_model_offline.py' first.")
         return
+    model_info = model_version.model_info
     
     # Sidebar
     with st.sidebar:
@@ -438,6 +430,10 @@ def main_app(lang='en'):
         st.metric("Accuracy", f"{model_info['accuracy']*100:.2f}%")
         st.metric("F1-Score", f"{model_info['f1_score']*100:.2f}%")
         
+        cache_stats = get_prediction_cache().stats()
+        st.caption(f"Prediction cache: {cache_stats['hit_rate']*100:.0f}% hit rate "
+                   f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})")
+        
         st.markdown("---")
         
         page = st.radio("Navigation", [t['new_prediction'], t['view_history']])
@@ -480,18 +476,14 @@ def main_app(lang='en'):
                 'Age': age
             }
             
-            # Create dataframe
-            input_df = pd.DataFrame([list(user_data.values())], 
-                                    columns=['Pregnancies', 'Glucose', 'BloodPressure', 
-                                            'SkinThickness', 'Insulin', 'BMI', 
-                                            'DiabetesPedigreeFunction', 'Age'])
-            
-            # Scale input
-            input_scaled = scaler.transform(input_df)
+            # Feature row in model order (user_data keys follow FEATURE_COLUMNS)
+            input_row = np.fromiter(user_data.values(), dtype=np.float64, count=len(user_data))
             
-            # Make prediction
-            prediction = model.predict(input_scaled)[0]
-            probability = model.predict_proba(input_scaled)[0][1]
+            # Reuse the result for a repeated input; otherwise scale and predict
+            # (batched with concurrent sessions)
+            with timer('inference'):
+                prediction, probability = get_prediction_cache().predict(
+                    input_row, model_version.sha256, model_version.batcher.predict)
             
             # Save to history
             prediction_data = {
@@ -502,13 +494,14 @@ def main_app(lang='en'):
             add_prediction_to_history(st.session_state['username'], prediction_data)
             
             # Display results
-            st.markdown("---")
-            st.markdown(f"## {t['prediction_results']}")
+            st.markdown(fragments['results_header'])
             
             # Gauge chart
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
-                st.plotly_chart(create_gauge_chart(probability), use_container_width=True)
+                fig = gauge_chart(probability)
+                with timer('render.chart'):
+                    st.plotly_chart(fig, use_container_width=True)
             
             # Risk level
             risk_level, color, emoji = get_risk_level(probability, lang)
@@ -521,269 +514,11 @@ def main_app(lang='en'):
             """, unsafe_allow_html=True)
             
             # Recommendations
-            st.markdown(f"### {t['recommendations']}")
+            st.markdown(fragments['recommendations_header'])
             
             if prediction == 1:
-                st.markdown(f'<div class="info-box">⚠️ High risk detected. Please consult a healthcare provider immediately.</div>', unsafe_allow_html=True)
-                
-                # DETAILED DIET PLAN FOR DIABETIC PATIENTS
-                st.markdown("---")
-                st.markdown("### 🥗 **Recommended Diet Plan for Diabetes Management**")
-                
-                st.markdown("#### ✅ **Foods to EAT:**")
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown("""
-                    **🥬 Vegetables (Unlimited):**
-                    - Leafy greens: Spinach, kale, methi (fenugreek)
-                    - Broccoli, cauliflower, cabbage
-                    - Tomatoes, cucumber, capsicum
-                    - Bitter gourd (karela) - excellent for diabetes
-                    - Ridge gourd, bottle gourd, pumpkin
-                    
-                    **🍎 Fruits (Limited portions):**
-                    - Berries: Strawberries, blueberries
-                    - Apple (1 small/day)
-                    - Guava, papaya
-                    - Orange (1 small/day)
-                    - **Avoid:** Mango, banana, grapes (high sugar)
-                    
-                    **🌾 Whole Grains:**
-                    - Brown rice (instead of white rice)
-                    - Whole wheat roti
-                    - Oats, quinoa
-                    - Millets: Ragi, bajra, jowar
-                    - **Limit:** White rice, maida (refined flour)
-                    """)
-                
-                with col2:
-                    st.markdown("""
-                    **🥜 Proteins:**
-                    - Lentils: Moong dal, masoor dal
-                    - Chickpeas, kidney beans
-                    - Fish (salmon, mackerel) - 2-3 times/week
-                    - Chicken (skinless, grilled)
-                    - Eggs (boiled)
-                    - Paneer (cottage cheese) - in moderation
-                    - Tofu, soya
-                    
-                    **🥛 Dairy:**
-                    - Low-fat milk
-                    - Plain curd (yogurt)
-                    - Buttermilk (chaas)
-                    - **Limit:** Full-fat milk, cheese
-                    
-                    **🥤 Beverages:**
-                    - Water (8-10 glasses/day)
-                    - Green tea (unsweetened)
-                    - Herbal teas
-                    - Buttermilk
-                    - **Avoid:** Sugary drinks, soda, packaged juices
-                    """)
-                
-                st.markdown("---")
-                st.markdown("#### ❌ **Foods to AVOID:**")
-                
-                st.markdown("""
-                <div style="background-color: #ffebee; padding: 15px; border-radius: 10px; border-left: 5px solid #ef5350;">
-                
-                **🚫 High Sugar Foods:**
-                - White sugar, jaggery (limit)
-                - Sweets, candies, chocolates
-                - Ice cream, pastries, cakes
-                - Sweetened beverages, soft drinks
-                - Honey (in excess)
-                
-                **🚫 Refined Carbohydrates:**
-                - White bread, maida products
-                - White rice (prefer brown rice)
-                - Pasta (refined), noodles
-                - Biscuits, cookies
-                - Packaged snacks, chips
-                
-                **🚫 Fried & Processed Foods:**
-                - Deep-fried foods (samosa, pakora, puri)
-                - Fast food (pizza, burger, fries)
-                - Processed meats (sausages, salami)
-                - Trans fats, vanaspati
-                
-                **🚫 High-Fat Foods:**
-                - Full-fat dairy products
-                - Fatty cuts of meat
-                - Coconut oil in excess
-                - Butter, ghee (limit to 1-2 tsp/day)
-                
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown("---")
-                st.markdown("### 🍽️ **Sample Daily Meal Plan**")
-                
-                meal_col1, meal_col2, meal_col3 = st.columns(3)
-                
-                with meal_col1:
-                    st.markdown("""
-                    **🌅 Breakfast (7-8 AM):**
-                    - 2 wheat rotis + vegetable curry
-                    OR
-                    - 1 bowl oats + nuts
-                    OR
-                    - 2 boiled eggs + 1 toast
-                    - 1 cup green tea (no sugar)
-                    
-                    **☕ Mid-Morning (10-11 AM):**
-                    - 1 fruit (apple/guava)
-                    OR
-                    - Handful of nuts (almonds/walnuts)
-                    - Buttermilk
-                    """)
-                
-                with meal_col2:
-                    st.markdown("""
-                    **🍛 Lunch (12-1 PM):**
-                    - 1-2 rotis (whole wheat)
-                    - 1 bowl dal (lentils)
-                    - 1 bowl vegetable curry
-                    - Salad (unlimited)
-                    - 1 cup curd
-                    - **Avoid:** White rice or limit to ½ cup
-                    
-                    **🥤 Evening (4-5 PM):**
-                    - Green tea + roasted chana
-                    OR
-                    - Sprouts salad
-                    OR
-                    - Vegetable soup
-                    """)
-                
-                with meal_col3:
-                    st.markdown("""
-                    **🌙 Dinner (7-8 PM):**
-                    - 1-2 rotis
-                    - Grilled chicken/fish OR dal
-                    - 1 bowl vegetables
-                    - Salad
-                    - **Early dinner:** Before 8 PM
-                    
-                    **🛏️ Before Bed:**
-                    - 1 cup warm milk (low-fat)
-                    - **Avoid:** Late-night snacking
-                    """)
-                
-                st.markdown("---")
-                st.markdown("### 🏃 **Recommended Exercise Plan**")
-                
-                st.markdown("""
-                <div style="background-color: #e8f5e9; padding: 15px; border-radius: 10px; border-left: 5px solid #66bb6a;">
-                
-                **⏰ Goal:** At least 150 minutes per week (30 min/day × 5 days)
-                
-                </div>
-                """, unsafe_allow_html=True)
-                
-                ex_col1, ex_col2 = st.columns(2)
-                
-                with ex_col1:
-                    st.markdown("""
-                    **🚶 Aerobic Exercises (Daily):**
-                    - **Walking:** 30-45 minutes brisk walk
-                      - Best: Morning or evening
-                      - After meals helps reduce blood sugar
-                    - **Jogging/Running:** 20-30 minutes
-                    - **Cycling:** 30-45 minutes
-                    - **Swimming:** 30 minutes
-                    - **Dancing:** 30 minutes
-                    
-                    **💪 Strength Training (3x/week):**
-                    - Weight lifting (light weights)
-                    - Resistance bands
-                    - Push-ups, squats, lunges
-                    - Core exercises
-                    - **Duration:** 20-30 minutes
-                    
-                    **🧘 Flexibility (Daily):**
-                    - Yoga: 20-30 minutes
-                    - Stretching: 10-15 minutes
-                    - Pranayama (breathing exercises)
-                    """)
-                
-                with ex_col2:
-                    st.markdown("""
-                    **📅 Weekly Exercise Schedule:**
-                    
-                    **Monday:** 30 min walk + 20 min strength
-                    **Tuesday:** 30 min cycling/jogging
-                    **Wednesday:** 30 min walk + 20 min yoga
-                    **Thursday:** 30 min swimming/dancing
-                    **Friday:** 30 min walk + 20 min strength
-                    **Saturday:** 45 min brisk walk
-                    **Sunday:** 30 min yoga/stretching (light)
-                    
-                    **⚠️ Important Tips:**
-                    - Start slowly, increase gradually
-                    - Check blood sugar before exercise
-                    - Carry glucose tablets (low sugar emergency)
-                    - Wear comfortable shoes
-                    - Stay hydrated
-                    - Exercise at same time daily
-                    - **Best time:** 30-60 min after meals
-                    """)
-                
-                st.markdown("---")
-                st.markdown("### 📋 **Additional Lifestyle Tips**")
-                
-                st.markdown("""
-                <div style="background-color: #e3f2fd; padding: 15px; border-radius: 10px;">
-                
-                **✅ Do's:**
-                - Monitor blood sugar regularly (before meals, 2 hours after meals)
-                - Eat small, frequent meals (5-6 times/day)
-                - Drink 8-10 glasses of water daily
-                - Sleep 7-8 hours/night
-                - Manage stress (meditation, yoga)
-                - Check feet daily for cuts/sores
-                - Regular health check-ups (every 3 months)
-                - Take medications on time
-                - Carry diabetic ID card
-                
-                **❌ Don'ts:**
-                - Skip meals (causes blood sugar fluctuations)
-                - Smoke (increases complications)
-                - Drink alcohol (or limit strictly)
-                - Sit for long periods (move every 30 min)
-                - Ignore symptoms (thirst, frequent urination, fatigue)
-                - Self-medicate
-                - Delay doctor visits
-                
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown("---")
-                st.markdown("### 📞 **When to Contact Doctor IMMEDIATELY:**")
-                
-                st.markdown("""
-                <div style="background-color: #fff3e0; padding: 15px; border-radius: 10px; border-left: 5px solid #ffa726;">
-                
-                **🚨 Emergency Signs:**
-                - Blood sugar below 70 mg/dL (hypoglycemia)
-                - Blood sugar above 300 mg/dL (hyperglycemia)
-                - Severe dizziness or confusion
-                - Excessive thirst/urination
-                - Blurred vision
-                - Chest pain
-                - Difficulty breathing
-                - Numbness in feet/hands
-                - Non-healing wounds
-                
-                **Emergency Contacts:**
-                - Keep doctor's number handy
-                - Know nearest hospital location
-                - Inform family about condition
-                
-                </div>
-                """, unsafe_allow_html=True)
+                # Diet, meal, exercise and warning sections, prebuilt per language
+                render_fragments(fragments['high_risk_plan'])
             
             # GENERAL RECOMMENDATIONS (even for low/medium risk)
             if glucose > 140:
@@ -800,20 +535,9 @@ def main_app(lang='en'):
             
             # Basic recommendations for everyone
             if prediction == 0:  # Low risk patients also get basic tips
-                st.markdown("---")
-                st.markdown("### ✅ **Maintain Your Healthy Lifestyle:**")
-                st.markdown("""
-                - Continue balanced diet with whole grains, vegetables, lean proteins
-                - Exercise 150 minutes/week (30 min × 5 days)
-                - Maintain healthy weight (BMI 18.5-24.9)
-                - Regular health check-ups annually
-                - Manage stress through yoga/meditation
-                - Avoid smoking and limit alcohol
-                - Sleep 7-8 hours/night
-                """)
+                st.markdown(fragments['healthy_lifestyle'])
             
-            st.markdown(f'<div class="info-box">✅ Exercise: Aim for at least 150 minutes of moderate aerobic activity per week.</div>', unsafe_allow_html=True)
-            st.markdown(f'<div class="info-box">✅ Diet: Follow a balanced diet rich in vegetables, whole grains, and lean proteins.</div>', unsafe_allow_html=True)
+            st.markdown(fragments['general_tips'], unsafe_allow_html=True)
             
             # Download report
             st.markdown("---")
@@ -824,12 +548,11 @@ def main_app(lang='en'):
                 'Probability': f"{probability*100:.2f}%",
                 **user_data
             }
-            report_df = pd.DataFrame([report_data])
-            csv = report_df.to_csv(index=False)
+            report_csv = create_report_csv(report_data)
             
             st.download_button(
                 label=t['download_report'],
-                data=csv,
+                data=report_csv,
                 file_name=f"diabetes_prediction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv",
                 use_container_width=True
@@ -839,23 +562,40 @@ def main_app(lang='en'):
         # History page
         st.markdown(f"### {t['prediction_history']}")
         
-        history = get_user_history(st.session_state['username'])
+        username = st.session_state['username']
+        store = get_history_store()
+        with timer('load_history'):
+            total = store.count_user(username)
         
-        if not history:
+        if not total:
             st.info(t['no_history'])
         else:
-            # Show trend chart
+            # Show trend chart (downsampled for long histories)
             st.markdown(f"#### {t['trend_chart']}")
-            fig = create_history_chart(history)
+            with timer('load_history'):
+                points = store.get_user_points(username)
+            fig = history_chart(points)
             if fig:
-                st.plotly_chart(fig, use_container_width=True)
+                with timer('render.chart'):
+                    st.plotly_chart(fig, use_container_width=True)
+            if total > MAX_CHART_POINTS:
+                st.caption(f"Showing the shape of {total:,} predictions with {MAX_CHART_POINTS} points")
             
-            # Show history table
+            # Show one page of the history table
             st.markdown("---")
             st.markdown("#### Detailed History")
             
+            col1, col2 = st.columns(2)
+            with col1:
+                page_size = st.selectbox("Rows per page", HISTORY_PAGE_SIZES, index=1)
+            pages = (total + page_size - 1) // page_size
+            with col2:
+                page_number = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+            
             history_data = []
-            for item in reversed(history):  # Most recent first
+            with timer('load_history'):
+                page_items = store.get_user_page(username, (page_number - 1) * page_size, page_size)
+            for item in page_items:  # Most recent first
                 date = item['date']
                 prob = item['data']['probability']
                 risk_level, _, emoji = get_risk_level(prob, lang)
@@ -872,22 +612,29 @@ def main_app(lang='en'):
             history_df = pd.DataFrame(history_data)
             st.dataframe(history_df, use_container_width=True)
             
-            # Download full history
-            full_csv = history_df.to_csv(index=False)
-            st.download_button(
-                label="📥 Download Full History",
-                data=full_csv,
-                file_name=f"prediction_history_{st.session_state['username']}.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
+            # Build the full export only when asked for; keep it for the download rerun
+            col1, col2 = st.columns(2)
+            with col1:
+                export_format = st.selectbox("Export format", list(EXPORT_FORMATS), format_func=str.upper)
+            with col2:
+                st.markdown("<br>", unsafe_allow_html=True)
+                if st.button("📄 Prepare Full History Export", use_container_width=True):
+                    st.session_state['history_export'] = (username, export_format,
+                                                          export_user(store, username, export_format))
+            export = st.session_state.get('history_export')
+            if export and export[0] == username:
+                _, export_format, data = export
+                mime, extension = EXPORT_FORMATS[export_format]
+                st.download_button(
+                    label=f"📥 Download Full History ({export_format.upper()})",
+                    data=data,
+                    file_name=f"prediction_history_{username}{extension}",
+                    mime=mime,
+                    use_container_width=True
+                )
     
     # Footer
-    st.markdown("---")
-    st.markdown(
-        f"<p style='text-align: center; color: gray;'>{t['disclaimer']}</p>",
-        unsafe_allow_html=True
-    )
+    st.markdown(fragments['footer'], unsafe_allow_html=True)
 
 def main():
     """Main application entry point"""
@@ -899,6 +646,9 @@ def main():
     if 'language' not in st.session_state:
         st.session_state['language'] = 'en'
     
+    # Start loading the model while the login page is shown
+    get_warmup()
+    
     # Language selector in sidebar
     with st.sidebar:
         lang_options = {
@@ -928,4 +678,10 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    start_metrics_endpoint()
+    # PROFILE_RATE=0.05 profiles 5% of reruns into profiles/
+    with sampled_profile('rerun'), trace() as spans, timer('rerun'):
+        main()
+    if os.environ.get('SHOW_TIMINGS'):
+        st.sidebar.caption(" · ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in spans))
+    export_if_due()
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+User Authentication
+Salted scrypt password hashes, tuned to a target login latency
+"""
+
+import argparse
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import statistics
+import threading
+import time
+from datetime import datetime
+
+from storage import atomic_write_json, read_json, update_json
+
+USER_DB_FILE = 'users.json'
+AUTH_CONFIG_FILE = 'auth_config.json'
+
+# scrypt cost when auth_config.json has not been tuned: 16 MiB, ~50ms
+DEFAULT_PARAMS = {'n': 2 ** 14, 'r': 8, 'p': 1}
+DEFAULT_TARGET_MS = 250
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+logger = logging.getLogger(__name__)
+
+
+def load_params(path=AUTH_CONFIG_FILE):
+    """scrypt cost parameters for new hashes"""
+    return dict(DEFAULT_PARAMS, **read_json(path).get('scrypt', {}))
+
+
+def _scrypt(password, salt, n, r, p):
+    # 128 * n * r bytes for the scrypt buffer, plus headroom
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p + 2 ** 20, dklen=KEY_BYTES)
+
+
+def hash_password(password, params=None):
+    """Salted scrypt hash as 'scrypt$n$r$p$salt$key' (hex salt and key)"""
+    params = params or load_params()
+    salt = secrets.token_bytes(SALT_BYTES)
+    key = _scrypt(password, salt, params['n'], params['r'], params['p'])
+    return f"scrypt${params['n']}${params['r']}${params['p']}${salt.hex()}${key.hex()}"
+
+
+def verify_password(password, stored, params=None):
+    """Check password against a stored hash; returns (matches, needs_rehash)
+
+    Accepts scrypt hashes and legacy unsalted SHA-256 digests. needs_rehash
+    is True for a match whose hash is legacy or uses other cost parameters
+    than the current ones. Digests are compared in constant time. Hashes
+    that cannot be parsed are logged and never match.
+    """
+    if '$' not in stored:
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+        matches = hmac.compare_digest(candidate, stored)
+        return matches, matches
+
+    try:
+        scheme, n, r, p, salt, key = stored.split('$')
+        if scheme != 'scrypt':
+            raise ValueError(f"unknown scheme '{scheme}'")
+        n, r, p = int(n), int(r), int(p)
+        salt, key = bytes.fromhex(salt), bytes.fromhex(key)
+        candidate = _scrypt(password, salt, n, r, p)
+    except ValueError as e:  # malformed or foreign hash, or scrypt rejecting its parameters
+        logger.warning("Cannot verify stored password hash: %s", e)
+        return False, False
+    matches = hmac.compare_digest(candidate, key)
+    params = params or load_params()
+    return matches, matches and (n, r, p) != (params['n'], params['r'], params['p'])
+
+
+class UserIndex:
+    """In-memory copy of the user file, reloaded when its mtime or size changes
+
+    Logins no longer parse users.json each time; writers still go through
+    update_json, and the next lookup sees their change.
+    """
+
+    def __init__(self, path=USER_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._users = {}
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def users(self):
+        signature = self._file_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._users = read_json(self.path)
+                self._signature = signature
+            return self._users
+
+    def get(self, username):
+        """A user's entry, or None"""
+        return self.users().get(username)
+
+
+class Authenticator:
+    """Verifies logins and creates accounts against the user file"""
+
+    def __init__(self, path=USER_DB_FILE, config_path=AUTH_CONFIG_FILE):
+        self.path = path
+        self.index = UserIndex(path)
+        self.params = load_params(config_path)
+        # Unknown users are checked against this, so they take as long as known ones
+        self._dummy_hash = hash_password(secrets.token_hex(16), self.params)
+
+    def authenticate(self, username, password):
+        """True if the password matches; upgrades outdated hashes on success"""
+        user = self.index.get(username)
+        stored = user['password'] if user else self._dummy_hash
+        matches, needs_rehash = verify_password(password, stored, self.params)
+        if not user or not matches:
+            return False
+        if needs_rehash:
+            self._rehash(username, stored, password)
+        return True
+
+    def _rehash(self, username, stored, password):
+        new_hash = hash_password(password, self.params)
+
+        def replace(users):
+            # Skip if the password changed since it was verified
+            if username in users and users[username]['password'] == stored:
+                users[username]['password'] = new_hash
+
+        update_json(self.path, replace)
+
+    def create_user(self, username, password):
+        """Add a user; returns False if the name is taken"""
+        password_hash = hash_password(password, self.params)
+
+        def add_user(users):
+            if username in users:
+                return False
+            users[username] = {'password': password_hash, 'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+            return True
+
+        # Check and insert under the writer lock so two signups can't race
+        return update_json(self.path, add_user)
+
+
+def _hash_ms(params, repeats=3):
+    password, salt = 'benchmark-password', secrets.token_bytes(SALT_BYTES)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _scrypt(password, salt, params['n'], params['r'], params['p'])
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def tune_params(target_ms=DEFAULT_TARGET_MS, r=8, p=1, verbose=False):
+    """Largest power-of-two scrypt n whose hash takes at most target_ms here
+
+    Never goes below DEFAULT_PARAMS' n; cost roughly doubles with n.
+    """
+    params = dict(DEFAULT_PARAMS, r=r, p=p)
+    while True:
+        elapsed = _hash_ms(params)
+        if verbose:
+            print(f"  n=2^{params['n'].bit_length() - 1:<3d} {elapsed:8.1f}ms")
+        if elapsed * 2 > target_ms:
+            return params, elapsed
+        params['n'] *= 2
+
+
+def main():
+    """Tune the scrypt cost for this machine"""
+    parser = argparse.ArgumentParser(description="Benchmark scrypt and save the cost for a target login time")
+    parser.add_argument('--target-ms', type=float, default=DEFAULT_TARGET_MS, help="Target time per password hash")
+    parser.add_argument('--dry-run', action='store_true', help="Print the tuned cost without saving it")
+    args = parser.parse_args()
+
+    print(f"Tuning scrypt for {args.target_ms:.0f}ms per hash:")
+    params, elapsed = tune_params(args.target_ms, verbose=True)
+    print(f"Chosen n=2^{params['n'].bit_length() - 1}, r={params['r']}, p={params['p']} "
+          f"({elapsed:.1f}ms, {128 * params['n'] * params['r'] // 2 ** 20} MiB)")
+    if args.dry_run:
+        return
+    atomic_write_json(AUTH_CONFIG_FILE, {'scrypt': params, 'target_ms': args.target_ms,
+                                         'measured_ms': round(elapsed, 1)})
+    print(f"Saved to {AUTH_CONFIG_FILE}; existing hashes are upgraded at their next login.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Batch Diabetes Risk Scoring
+Score large CSV/Parquet patient files in fixed-size chunks
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from fast_predictor import FastPredictor, compiled_max_rows
+from inference import FEATURE_COLUMNS, clean_features, get_fill_values, get_threshold, load_artifacts
+
+DEFAULT_CHUNKSIZE = 50000
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def read_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrame chunks from a CSV or Parquet file"""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # A blank cell turns an int column into float in later chunks, so
+            # features are always float64 and other columns follow the first chunk
+            df = df.astype({column: 'float64' for column in FEATURE_COLUMNS if column in df.columns})
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            elif table.schema != self._parquet_writer.schema:
+                table = table.cast(self._parquet_writer.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._wrote_header else 'w',
+                      header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_chunk(df, predictor, fill_values):
+    """Add Prediction and Probability columns to one chunk, scored by a FastPredictor"""
+    X = clean_features(df, fill_values).to_numpy(dtype=np.float64)
+    predictions, probabilities = predictor.predict(X)
+    scored = df.copy()
+    scored['Prediction'] = predictions
+    scored['Probability'] = probabilities
+    return scored
+
+
+def score_batch(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE, artifacts=None):
+    """Score every row of input_path and write the results to output_path
+
+    Only one chunk is held in memory at a time. artifacts is an optional
+    (model, scaler, model_info) tuple as returned by load_model().
+    Returns the number of rows scored.
+    """
+    model, scaler, model_info = artifacts or load_artifacts()
+    if model is None:
+        raise FileNotFoundError("Model not found! Please run 'train_model.py' first.")
+    fill_values = get_fill_values(scaler, model_info)
+    # Chunks past the compiled-trees crossover go straight to the model's predict_proba
+    predictor = FastPredictor(model, scaler, get_threshold(model_info), compiled_max_rows(model_info))
+
+    writer = ChunkWriter(output_path)
+    rows = 0
+    try:
+        for chunk in read_chunks(input_path, chunksize):
+            writer.write(score_chunk(chunk, predictor, fill_values))
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of patient records")
+    parser.add_argument('input', help="Input .csv or .parquet file with the 8 feature columns")
+    parser.add_argument('output', help="Output .csv or .parquet file")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk")
+    args = parser.parse_args()
+
+    rows = score_batch(args.input, args.output, args.chunksize)
+    print(f"Scored {rows} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Performance Benchmark Suite
+Time the app's real entry points and gate deploys on a saved baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from storage import atomic_write_json
+
+BASELINE_FILE = 'benchmark_baseline.json'
+DEFAULT_TOLERANCE = 0.25
+
+# Differences below this are timer noise, whatever the ratio
+MIN_DELTA_MS = 0.05
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+HISTORY_SIZES = [100, 1000, 10000, 100000]
+JSON_HISTORY_SIZES = [100, 1000, 10000]
+CHART_SIZES = [10, 100, 1000]
+
+# The quick suite keeps every case but skips the largest sizes
+QUICK_LIMIT = 10000
+
+# A new process with empty module caches, as after a deploy
+COLD_LOAD_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from model_registry import ModelRegistry
+registry = ModelRegistry(poll_interval=None)
+elapsed = time.perf_counter() - start
+registry.close()
+print(json.dumps(elapsed))
+"""
+
+# First render of an app in a new process; reports the heavy modules the app
+# itself imported (Streamlit already brings in pandas and plotly.graph_objects)
+STARTUP_SCRIPT = """
+import json, os, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+sys.path.insert(0, os.path.dirname(os.path.abspath(sys.argv[1])))
+before = set(sys.modules)
+start = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=120).run()
+elapsed = time.perf_counter() - start
+imported = set(sys.modules) - before
+heavy = [name for name in sys.argv[2:] if name in imported]
+print(json.dumps({'seconds': elapsed, 'heavy_imports': heavy}))
+"""
+
+STARTUP_APPS = ['app.py', 'app_enhanced.py']
+HEAVY_MODULES = ['sklearn', 'scipy', 'pandas', 'plotly.graph_objects', 'plotly.express']
+
+SAMPLE_INPUTS = {'Pregnancies': 2, 'Glucose': 140, 'Blood Pressure': 70, 'Skin Thickness': 25,
+                 'Insulin': 90, 'BMI': 31.5, 'Pedigree Function': 0.4, 'Age': 45}
+
+
+def measure(fn, min_repeats=5, max_repeats=1000, min_seconds=0.5):
+    """Time fn() until min_seconds have passed; returns millisecond statistics"""
+    fn()  # warm up
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_repeats and (len(timings) < min_repeats
+                                          or time.perf_counter() - started < min_seconds):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return _summary(timings)
+
+
+def _summary(timings):
+    return {
+        'median_ms': statistics.median(timings),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'min_ms': min(timings),
+        'repeats': len(timings),
+    }
+
+
+def bench_cold_load(repeats=3):
+    """ModelRegistry() (what load_model() builds) in fresh interpreters"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', COLD_LOAD_SCRIPT], cwd=os.getcwd(),
+                                env=dict(os.environ, PYTHONPATH=here), capture_output=True,
+                                text=True, check=True).stdout
+        timings.append(json.loads(output.strip().splitlines()[-1]) * 1000)
+    return {'load_model.cold': _summary(timings)}
+
+
+def bench_startup(repeats=3):
+    """First render of each app (the login page for app_enhanced) in fresh interpreters"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for app in STARTUP_APPS:
+        timings = []
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, os.path.join(here, app)] + HEAVY_MODULES,
+                                    cwd=os.getcwd(), capture_output=True, text=True, check=True).stdout
+            report = json.loads(output.strip().splitlines()[-1])
+            timings.append(report['seconds'] * 1000)
+        results[f'startup.{os.path.splitext(app)[0]}'] = dict(_summary(timings),
+                                                              heavy_imports=report['heavy_imports'])
+    return results
+
+
+def bench_inference(quick=False):
+    """Single-row path of main_app and batched scoring"""
+    from model_registry import ModelRegistry
+    from prediction_cache import PredictionCache
+
+    registry = ModelRegistry(poll_interval=None, max_wait_ms=0)  # as the apps build it
+    version = registry.current()
+    if version is None:
+        raise FileNotFoundError("Model not found! Please run 'train_model.py' first.")
+    results = {'load_model.warm': measure(lambda: ModelRegistry(poll_interval=None).close(),
+                                          min_repeats=3, max_repeats=20)}
+
+    rng = np.random.default_rng(42)
+    rows = rng.uniform([0, 50, 40, 10, 15, 18, 0.1, 21], [15, 200, 110, 60, 500, 50, 2.0, 80],
+                       size=(max(BATCH_SIZES), 8))
+
+    # As in main_app: array from the form values, prediction cache, micro-batcher
+    input_row = np.fromiter(SAMPLE_INPUTS.values(), dtype=np.float64, count=len(SAMPLE_INPUTS))
+    cache = PredictionCache()
+    results['single_row.cache_hit'] = measure(
+        lambda: cache.predict(input_row, version.sha256, version.batcher.predict))
+    rows_iter = iter(rows)  # every row distinct, so every lookup misses
+    results['single_row.cache_miss'] = measure(
+        lambda: cache.predict(next(rows_iter), version.sha256, version.batcher.predict), max_repeats=len(rows) - 1)
+    results['single_row.predictor'] = measure(lambda: version.predictor.predict_row(input_row))
+
+    for size in BATCH_SIZES:
+        if quick and size > QUICK_LIMIT:
+            continue
+        batch = rows[:size]
+        results[f'batch.{size}'] = measure(lambda: version.predictor.predict(batch), max_repeats=200)
+    registry.close()
+    return results
+
+
+def _record(i, probability):
+    date = datetime.fromtimestamp(1704067200 + 3600 * i).strftime("%Y-%m-%d %H:%M:%S")
+    return {'date': date, 'data': {'prediction': int(probability >= 0.5), 'probability': probability,
+                                   'inputs': SAMPLE_INPUTS}}
+
+
+def bench_history(quick=False):
+    """add_prediction_to_history's append with a growing history, per backend"""
+    from history_store import JSONHistoryStore, SQLiteHistoryStore
+
+    results = {}
+    directory = tempfile.mkdtemp(prefix='bench_history_')
+    try:
+        for backend, store_class, sizes in [('sqlite', SQLiteHistoryStore, HISTORY_SIZES),
+                                            ('json', JSONHistoryStore, JSON_HISTORY_SIZES)]:
+            store = store_class(os.path.join(directory, f'history.{backend}'))
+            filled = 0
+            for size in sizes:
+                if quick and size > QUICK_LIMIT:
+                    continue
+                store.append_many([('bench', _record(i, (i * 37 % 100) / 100)) for i in range(filled, size)])
+                filled = size
+                # Appends go to another user so the measured size stays put
+                results[f'history_append.{backend}.{size}'] = measure(
+                    lambda: store.append('other', _record(0, 0.5)), min_repeats=10, max_repeats=200)
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+def bench_charts(quick=False):
+    """create_history_chart, built and serialized as st.plotly_chart does"""
+    import plotly.io as pio
+    from charts import create_history_chart
+
+    results = {}
+    for size in CHART_SIZES:
+        history = [_record(i, (i * 37 % 100) / 100) for i in range(size)]
+        results[f'history_chart.{size}'] = measure(
+            lambda: pio.to_json(create_history_chart(history).to_dict(), validate=False), max_repeats=100)
+    return results
+
+
+SUITES = {
+    'cold_load': lambda quick: bench_cold_load(),
+    'startup': lambda quick: bench_startup(),
+    'inference': bench_inference,
+    'history': bench_history,
+    'charts': bench_charts,
+}
+
+SUITE_PREFIXES = {
+    'cold_load': ('load_model.cold',),
+    'startup': ('startup.',),
+    'inference': ('load_model.warm', 'single_row.', 'batch.'),
+    'history': ('history_append.',),
+    'charts': ('history_chart.',),
+}
+
+
+def _prefixes(suites):
+    return [prefix for suite in suites or SUITES for prefix in SUITE_PREFIXES[suite]]
+
+
+def run_suite(suites=None, quick=False, verbose=True):
+    """Run the selected suites; returns {benchmark name: statistics}"""
+    results = {}
+    for name in suites or SUITES:
+        if verbose:
+            print(f"Running {name}...", flush=True)
+        results.update(SUITES[name](quick))
+    return results
+
+
+def environment():
+    """What the numbers were measured on"""
+    import sklearn
+
+    from inference import load_manifest
+
+    manifest = load_manifest()
+    return {
+        'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'artifact': manifest['artifact'] if manifest else None,
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta_ms=MIN_DELTA_MS):
+    """Rows of (name, baseline ms, current ms, ratio, status) for each benchmark
+
+    A benchmark regresses when its median is more than tolerance slower
+    than the baseline median and the difference is above min_delta_ms.
+    """
+    rows = []
+    for name in sorted(set(results) | set(baseline)):
+        if name not in baseline:
+            rows.append((name, None, results[name]['median_ms'], None, 'new'))
+            continue
+        if name not in results:
+            rows.append((name, baseline[name]['median_ms'], None, None, 'missing'))
+            continue
+        before, after = baseline[name]['median_ms'], results[name]['median_ms']
+        ratio = after / before if before else float('inf')
+        regressed = ratio > 1 + tolerance and after - before > min_delta_ms
+        rows.append((name, before, after, ratio, 'REGRESSION' if regressed else 'ok'))
+    return rows
+
+
+def print_results(results):
+    print(f"{'benchmark':34s} {'median':>11s} {'p95':>11s} {'runs':>6s}")
+    for name, stats in results.items():
+        print(f"{name:34s} {stats['median_ms']:9.3f}ms {stats['p95_ms']:9.3f}ms {stats['repeats']:6d}")
+        if 'heavy_imports' in stats:
+            print(f"{'':34s} imports {', '.join(stats['heavy_imports']) or 'no heavy modules'}")
+
+
+def print_comparison(rows, tolerance):
+    print(f"{'benchmark':34s} {'baseline':>11s} {'current':>11s} {'ratio':>7s}")
+    for name, before, after, ratio, status in rows:
+        before_text = f"{before:9.3f}ms" if before is not None else f"{'-':>11s}"
+        after_text = f"{after:9.3f}ms" if after is not None else f"{'-':>11s}"
+        ratio_text = f"{ratio:6.2f}x" if ratio is not None else f"{'-':>7s}"
+        print(f"{name:34s} {before_text} {after_text} {ratio_text}  {status}")
+    regressions = sum(status == 'REGRESSION' for *_, status in rows)
+    print(f"\n{regressions} regression(s) beyond {tolerance:.0%}")
+
+
+def main():
+    """Run the benchmarks, save a baseline or compare against one"""
+    parser = argparse.ArgumentParser(description="Benchmark the app's inference, history and chart paths")
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES),
+                        help="Suite to run (repeatable; default: all)")
+    parser.add_argument('--quick', action='store_true', help=f"Skip sizes above {QUICK_LIMIT:,}")
+    parser.add_argument('--save', nargs='?', const=BASELINE_FILE, default=None, metavar='PATH',
+                        help=f"Write results as the baseline (default: {BASELINE_FILE})")
+    parser.add_argument('--compare', nargs='?', const=BASELINE_FILE, default=None, metavar='PATH',
+                        help=f"Compare with a baseline and exit 1 on regressions (default: {BASELINE_FILE})")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before a regression is flagged (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    if args.compare and not os.path.exists(args.compare):
+        print(f"Baseline not found: {args.compare}. Run with --save first.")
+        sys.exit(2)
+
+    results = run_suite(args.suite, args.quick)
+    print()
+    print_results(results)
+
+    if args.save:
+        atomic_write_json(args.save, {'environment': environment(), 'results': results})
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # Only compare what was run this time
+        ran = {name: stats for name, stats in baseline['results'].items()
+               if any(name.startswith(prefix) for prefix in _prefixes(args.suite))}
+        print(f"\nCompared with {args.compare} ({baseline['environment']['created']}):")
+        rows = compare(results, ran, args.tolerance)
+        print_comparison(rows, args.tolerance)
+        if any(status == 'REGRESSION' for *_, status in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Chart Rendering
+Plotly figures for the apps, memoized by their inputs
+"""
+
+import argparse
+import functools
+import time
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from downsample import MAX_CHART_POINTS, downsample_points
+from instrumentation import timed
+
+# Gauge probabilities are bucketed to 0.1%, so at most 1001 distinct figures
+GAUGE_RESOLUTION = 1000
+
+HISTORY_CACHE_SIZE = 256
+
+
+def create_gauge_chart(probability):
+    """Create a gauge chart for risk visualization"""
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number+delta",
+        value=probability * 100,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Risk Score", 'font': {'size': 24}},
+        delta={'reference': 50},
+        gauge={
+            'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
+            'bar': {'color': "darkblue"},
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': "gray",
+            'steps': [
+                {'range': [0, 30], 'color': '#e8f5e9'},
+                {'range': [30, 60], 'color': '#fff3e0'},
+                {'range': [60, 100], 'color': '#ffebee'}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 90
+            }
+        }
+    ))
+    
+    fig.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
+    return fig
+
+def create_history_chart(history_data):
+    """Create trend chart from history"""
+    if not history_data:
+        return None
+    
+    dates = [item['date'] for item in history_data]
+    probabilities = [item['data']['probability'] * 100 for item in history_data]
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=probabilities,
+        mode='lines+markers',
+        name='Risk %',
+        line=dict(color='#1f77b4', width=3),
+        marker=dict(size=10)
+    ))
+    
+    fig.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Low Risk Threshold")
+    fig.add_hline(y=60, line_dash="dash", line_color="red", annotation_text="High Risk Threshold")
+    
+    fig.update_layout(
+        title="Risk Trend Over Time",
+        xaxis_title="Date",
+        yaxis_title="Risk Probability (%)",
+        height=400,
+        hovermode='x unified'
+    )
+    
+    return fig
+
+
+@functools.lru_cache(maxsize=GAUGE_RESOLUTION + 1)
+def _cached_gauge(bucket):
+    return create_gauge_chart(bucket / GAUGE_RESOLUTION)
+
+
+@timed('chart.gauge')
+def gauge_chart(probability):
+    """Memoized gauge for probability rounded to 0.1%
+
+    Figures are shared between sessions; callers must not modify them.
+    Streamlit copies a figure with to_dict() before serializing it.
+    """
+    return _cached_gauge(round(probability * GAUGE_RESOLUTION))
+
+
+@functools.lru_cache(maxsize=HISTORY_CACHE_SIZE)
+def _cached_history(points):
+    return create_history_chart([{'date': date, 'data': {'probability': p}} for date, p in points])
+
+
+@timed('chart.history')
+def history_chart(points, max_points=MAX_CHART_POINTS, method='lttb'):
+    """Memoized trend chart of (date, probability) points, oldest first
+
+    Long histories are downsampled to max_points before plotting; the
+    cache is keyed on the points actually drawn.
+    """
+    if not points:
+        return None
+    return _cached_history(tuple(downsample_points(points, max_points, method)))
+
+
+def _render_ms(build, repeats):
+    # Build plus the to_dict/to_json Streamlit does for st.plotly_chart
+    start = time.perf_counter()
+    for i in range(repeats):
+        spec = pio.to_json(build(i).to_dict(), validate=False)
+    return (time.perf_counter() - start) / repeats * 1000, len(spec)
+
+
+def main():
+    """Compare uncached and memoized chart rendering"""
+    parser = argparse.ArgumentParser(description="Benchmark chart rendering with and without the cache")
+    parser.add_argument('--repeats', type=int, default=50, help="Renders per measurement")
+    parser.add_argument('--history-points', type=int, default=200, help="Points in the trend chart")
+    args = parser.parse_args()
+
+    # Reruns at the same prediction, as when Streamlit reruns on widget changes
+    probability = 0.4237
+    history = [{'date': f"2024-01-01 {i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+                'data': {'probability': (i * 37 % 100) / 100}} for i in range(args.history_points)]
+    points = [(item['date'], item['data']['probability']) for item in history]
+
+    cases = [
+        ('gauge', lambda i: create_gauge_chart(probability), lambda i: gauge_chart(probability)),
+        (f'history ({args.history_points} points)', lambda i: create_history_chart(history),
+         lambda i: history_chart(points)),
+    ]
+    print(f"{'chart':24s} {'uncached':>10s} {'cached':>10s} {'payload':>10s}")
+    for name, uncached, cached in cases:
+        before, size = _render_ms(uncached, args.repeats)
+        after, _ = _render_ms(cached, args.repeats)
+        print(f"{name:24s} {before:8.2f}ms {after:8.2f}ms {size / 1024:8.1f}KB  {before / after:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Time Series Downsampling
+Reduce long prediction histories to a few hundred points for plotting
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+# Points kept in the trend chart; more than this is not visible at chart width
+MAX_CHART_POINTS = 500
+
+METHODS = ('lttb', 'time')
+
+
+def to_seconds(dates):
+    """Seconds since the epoch for 'YYYY-MM-DD HH:MM:SS' date strings"""
+    return np.array(dates, dtype='datetime64[s]').astype(np.int64)
+
+
+def lttb(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept. The points in between are
+    split into n_out - 2 equal-count buckets, and from each bucket the
+    point forming the largest triangle with the previously kept point and
+    the mean of the next bucket is kept. Peaks and dips survive, unlike
+    with averaging.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    kept = np.empty(n_out, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle area; the constant factor does not change argmax
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def time_buckets(x, y, n_buckets):
+    """(x, y) means over n_buckets equal time spans; empty spans are dropped"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) <= n_buckets:
+        return x, y
+    span = x[-1] - x[0] or 1.0
+    bucket = np.minimum(((x - x[0]) / span * n_buckets).astype(np.intp), n_buckets - 1)
+    counts = np.bincount(bucket, minlength=n_buckets)
+    filled = counts > 0
+    mean_x = np.bincount(bucket, weights=x, minlength=n_buckets)[filled] / counts[filled]
+    mean_y = np.bincount(bucket, weights=y, minlength=n_buckets)[filled] / counts[filled]
+    return mean_x, mean_y
+
+
+def downsample_points(points, max_points=MAX_CHART_POINTS, method='lttb'):
+    """At most max_points (date, value) pairs summarizing points, in time order
+
+    'lttb' keeps a subset of the original points; 'time' averages the
+    points in equal time buckets.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'. Choose from: {', '.join(METHODS)}")
+    if len(points) <= max_points:
+        return list(points)
+
+    x = to_seconds([date for date, _ in points])
+    values = np.array([value for _, value in points], dtype=np.float64)
+    if method == 'lttb':
+        return [points[i] for i in lttb(x, values, max_points)]
+
+    mean_x, mean_y = time_buckets(x, values, max_points)
+    labels = np.datetime_as_string(np.round(mean_x).astype('datetime64[s]'), unit='s')
+    return [(str(label).replace('T', ' '), float(value)) for label, value in zip(labels, mean_y)]
+
+
+def main():
+    """Time both methods on a synthetic history"""
+    parser = argparse.ArgumentParser(description="Benchmark history downsampling")
+    parser.add_argument('--points', type=int, default=100000, help="Points in the synthetic history")
+    parser.add_argument('--max-points', type=int, default=MAX_CHART_POINTS, help="Points to keep")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    seconds = np.cumsum(rng.integers(60, 86400, size=args.points)) + 1704067200
+    dates = np.datetime_as_string(seconds.astype('datetime64[s]'), unit='s')
+    points = [(str(date).replace('T', ' '), float(p)) for date, p in zip(dates, rng.random(args.points))]
+
+    for method in METHODS:
+        start = time.perf_counter()
+        reduced = downsample_points(points, args.max_points, method)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{method:5s} {len(points):,} -> {len(reduced):,} points in {elapsed:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Fast Prediction Path
+Pandas-free scoring for the per-request hot path
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from inference import DEFAULT_THRESHOLD, FEATURE_COLUMNS, load_artifacts, predict
+from safe_artifact import LinearModel
+from tree_compiler import compile_model
+
+N_FEATURES = len(FEATURE_COLUMNS)
+
+# Largest batch scored by compiled trees when model_info has no measured
+# crossover (artifacts from before it was recorded); typical ensembles
+# measure 64-256 rows, deep boosted ones less
+COMPILED_MAX_ROWS = 64
+
+
+def compiled_max_rows(model_info):
+    """Batch-size cutoff for compiled trees measured at training time (see crossover_rows)"""
+    return (model_info or {}).get('compiled_trees', {}).get('max_rows', COMPILED_MAX_ROWS)
+
+
+class FastPredictor:
+    """Scores float64 rows in FEATURE_COLUMNS order without pandas
+
+    Scaling is a fused (x - mean_) / scale_ on NumPy arrays. Binary linear
+    models (Logistic Regression, SGD log-loss) are evaluated directly as
+    sigmoid(x . w + b). Tree ensembles score batches of up to
+    compiled_max_rows rows (single rows and micro-batches) with their
+    compiled arrays, avoiding sklearn's per-tree dispatch; larger batches go
+    to sklearn's Cython walk, which is faster there. Everything else gets a plain ndarray, skipping the DataFrame
+    construction and column checks of the generic path.
+    """
+
+    def __init__(self, model, scaler=None, threshold=DEFAULT_THRESHOLD, compiled_max_rows=COMPILED_MAX_ROWS):
+        # Fused artifacts wrap non-linear models in Pipeline(scaler, model)
+        if isinstance(model, Pipeline):
+            scaler = model.named_steps['scaler']
+            model = model.named_steps['model']
+
+        self.model = model
+        self.threshold = threshold
+        self.mean = None
+        self.scale = None
+        if scaler is not None:
+            self.mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(N_FEATURES)
+            self.scale = scaler.scale_ if scaler.scale_ is not None else np.ones(N_FEATURES)
+
+        self.linear = (isinstance(model, (LogisticRegression, SGDClassifier, LinearModel))
+                       and model.coef_.shape[0] == 1)
+        if self.linear:
+            self.coef = np.ascontiguousarray(model.coef_[0])
+            self.intercept = float(model.intercept_[0])
+
+        # A single tree is already one Cython call; only ensembles gain
+        compiled = None if self.linear else compile_model(model)
+        self.compiled = compiled if compiled is not None and compiled.n_trees > 1 else None
+        self.compiled_max_rows = compiled_max_rows
+
+        self._local = threading.local()
+
+    def predict_proba(self, X):
+        """Positive-class probability for each row of a 2-D float array"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        if self.linear:
+            return 1.0 / (1.0 + np.exp(-(X @ self.coef + self.intercept)))
+        if self.compiled is not None and len(X) <= self.compiled_max_rows:
+            return self.compiled.predict_proba(X)
+        return self.model.predict_proba(X)[:, 1]
+
+    def predict(self, X):
+        """(predictions, probabilities) for a 2-D float array"""
+        probabilities = self.predict_proba(X)
+        return (probabilities >= self.threshold).astype(int), probabilities
+
+    def predict_row(self, values):
+        """(prediction, probability) for one sequence of 8 feature values
+
+        Reuses a preallocated 1x8 buffer per thread.
+        """
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.empty((1, N_FEATURES), dtype=np.float64)
+        row[0] = values
+        probability = float(self.predict_proba(row)[0])
+        return int(probability >= self.threshold), probability
+
+
+def _time_per_call(fn, repeats):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    """Microbenchmark the single-row paths"""
+    parser = argparse.ArgumentParser(description="Compare the pandas and fast single-row paths")
+    parser.add_argument('--repeats', type=int, default=2000, help="Calls per path")
+    args = parser.parse_args()
+
+    model, scaler, model_info = load_artifacts()
+    if model is None:
+        print("Model not found! Please run 'train_model.py' first.")
+        return
+    values = [2, 140, 70, 25, 90, 31.5, 0.4, 45]
+    fast = FastPredictor(model, scaler)
+
+    def original_path():
+        input_df = pd.DataFrame([values], columns=FEATURE_COLUMNS)
+        input_scaled = scaler.transform(input_df) if scaler is not None else input_df
+        model.predict(input_scaled)
+        model.predict_proba(input_scaled)
+
+    def dataframe_path():
+        predict(model, scaler, pd.DataFrame([values], columns=FEATURE_COLUMNS))
+
+    timings = {
+        'DataFrame + predict + predict_proba': _time_per_call(original_path, args.repeats),
+        'DataFrame + single predict_proba': _time_per_call(dataframe_path, args.repeats),
+        'FastPredictor.predict_row': _time_per_call(lambda: fast.predict_row(values), args.repeats),
+    }
+
+    print(f"Model: {model_info['model_name']} ({args.repeats} calls per path)")
+    baseline = timings['DataFrame + predict + predict_proba']
+    for name, micros in timings.items():
+        print(f"  {name:38s} {micros:9.1f} us/call  {baseline / micros:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
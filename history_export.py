@@ -0,0 +1,211 @@
+"""
+History Export
+Stream prediction history from the history store as CSV, Parquet or JSON Lines
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+from history_store import DEFAULT_BACKEND, BACKENDS, get_history_store
+from inference import FEATURE_COLUMNS
+
+EXPORT_FIELDS = ['date', 'prediction', 'probability'] + FEATURE_COLUMNS
+
+# The all-users export adds the owner of each record
+ADMIN_EXPORT_FIELDS = ['username'] + EXPORT_FIELDS
+
+# Records per chunk (and per Parquet row group); bounds export memory use
+CHUNK_ROWS = 1000
+
+# Format name -> (MIME type, file extension)
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'jsonl': ('application/x-ndjson', '.jsonl'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+# History records store inputs under the apps' display labels
+INPUT_LABELS = {
+    'BloodPressure': 'Blood Pressure',
+    'SkinThickness': 'Skin Thickness',
+    'DiabetesPedigreeFunction': 'Pedigree Function',
+}
+
+
+def record_to_row(record, username=None):
+    """Flat export row for one history record"""
+    data = record['data']
+    row = {} if username is None else {'username': username}
+    row.update(date=record['date'], prediction=data['prediction'], probability=data['probability'])
+    inputs = data.get('inputs', {})
+    for column in FEATURE_COLUMNS:
+        row[column] = inputs.get(INPUT_LABELS.get(column, column), inputs.get(column))
+    return row
+
+
+def _batches(rows, chunk_rows):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, chunk_rows))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_csv(rows, fields=EXPORT_FIELDS, chunk_rows=CHUNK_ROWS):
+    """Yield CSV bytes, header first, chunk_rows rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, lineterminator='\n')
+    writer.writeheader()
+    for batch in _batches(rows, chunk_rows):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # header only, for an empty history
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(rows, fields=EXPORT_FIELDS, chunk_rows=CHUNK_ROWS):
+    """Yield JSON Lines bytes, one object per row, chunk_rows rows at a time"""
+    for batch in _batches(rows, chunk_rows):
+        yield ''.join(json.dumps(row) + '\n' for row in batch).encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what was written since the last drain
+
+    tell() keeps counting across drains, since Parquet records byte offsets.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _parquet_schema(fields):
+    import pyarrow as pa
+
+    types = {'username': pa.string(), 'date': pa.string(), 'prediction': pa.int64()}
+    return pa.schema([(field, types.get(field, pa.float64())) for field in fields])
+
+
+def iter_parquet(rows, fields=EXPORT_FIELDS, chunk_rows=CHUNK_ROWS):
+    """Yield Parquet bytes, one row group per chunk_rows rows"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(fields)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in _batches(rows, chunk_rows):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()  # footer
+
+
+WRITERS = {'csv': iter_csv, 'jsonl': iter_jsonl, 'parquet': iter_parquet}
+
+
+def _check_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+
+
+def iter_user_export(store, username, fmt='csv', chunk_rows=CHUNK_ROWS):
+    """Yield one user's history in fmt as byte chunks, oldest first"""
+    _check_format(fmt)
+    rows = (record_to_row(record) for record in store.iter_user_records(username))
+    return WRITERS[fmt](rows, EXPORT_FIELDS, chunk_rows)
+
+
+def iter_all_users_export(store, fmt='csv', chunk_rows=CHUNK_ROWS):
+    """Yield every user's history in fmt as byte chunks (admin export)
+
+    Records come from the store's cursor one chunk at a time, so memory
+    stays bounded by chunk_rows however large the store is (the legacy
+    JSON backend still parses its whole file).
+    """
+    _check_format(fmt)
+    rows = (record_to_row(record, username) for username, record in store.iter_records())
+    return WRITERS[fmt](rows, ADMIN_EXPORT_FIELDS, chunk_rows)
+
+
+def export_user(store, username, fmt='csv'):
+    """One user's full history in fmt, for a download button"""
+    return b''.join(iter_user_export(store, username, fmt))
+
+
+def write_export(chunks, path):
+    """Write export chunks to path; returns the number of bytes written"""
+    size = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def format_for_path(path):
+    """Export format implied by a file extension, defaulting to csv"""
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, (_, format_extension) in FORMATS.items():
+        if extension == format_extension:
+            return fmt
+    return 'csv'
+
+
+def main():
+    """Export one user's history, or everyone's, to a file"""
+    parser = argparse.ArgumentParser(description="Export prediction history as CSV, Parquet or JSON Lines")
+    parser.add_argument('output', help="Output file (.csv, .parquet or .jsonl)")
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument('--user', help="Export this user's history")
+    who.add_argument('--all', action='store_true', help="Export all users' history (admin)")
+    parser.add_argument('--format', choices=sorted(FORMATS), default=None,
+                        help="Output format (default: from the file extension)")
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=sorted(BACKENDS), help="History backend")
+    parser.add_argument('--store', default=None, help="History store path")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Records per chunk")
+    args = parser.parse_args()
+
+    fmt = args.format or format_for_path(args.output)
+    store = get_history_store(args.backend, args.store)
+    if args.all:
+        chunks = iter_all_users_export(store, fmt, args.chunk_rows)
+    else:
+        chunks = iter_user_export(store, args.user, fmt, args.chunk_rows)
+    size = write_export(chunks, args.output)
+    print(f"Wrote {size:,} bytes of {fmt} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Prediction History Storage
+Pluggable backends for per-user prediction history
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+from storage import read_json, update_json
+
+# History files
+HISTORY_DB_FILE = 'prediction_history.db'
+LEGACY_HISTORY_FILE = 'prediction_history.json'
+
+DEFAULT_BACKEND = 'sqlite'
+
+# Records per page of the history table
+DEFAULT_PAGE_SIZE = 50
+
+
+class JSONHistoryStore:
+    """Legacy backend: all users' history in a single JSON file
+
+    Every append parses and rewrites the whole file, so this backend is kept
+    only for compatibility and as the migration source. Writers are
+    serialized with a file lock and publish with an atomic rename.
+    """
+
+    def __init__(self, path=LEGACY_HISTORY_FILE):
+        self.path = path
+
+    def _load(self):
+        return read_json(self.path)
+
+    def append(self, username, record):
+        """Add one record ({'date': ..., 'data': ...}) to a user's history"""
+        update_json(self.path, lambda history: history.setdefault(username, []).append(record))
+
+    def append_many(self, rows):
+        """Add many (username, record) pairs in one rewrite of the file"""
+        def add_all(history):
+            for username, record in rows:
+                history.setdefault(username, []).append(record)
+
+        update_json(self.path, add_all)
+
+    def get_user_history(self, username):
+        """Get a user's records, oldest first"""
+        return self._load().get(username, [])
+
+    def count_user(self, username):
+        """Number of records a user has"""
+        return len(self.get_user_history(username))
+
+    def get_user_page(self, username, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Get up to limit of a user's records, newest first, skipping offset"""
+        records = self.get_user_history(username)
+        end = len(records) - offset
+        return records[max(end - limit, 0):max(end, 0)][::-1]
+
+    def get_user_points(self, username):
+        """(date, probability) for each of a user's records, oldest first"""
+        return [(record['date'], record['data']['probability'])
+                for record in self.get_user_history(username)]
+
+    def iter_user_records(self, username):
+        """Yield a user's records, oldest first"""
+        yield from self.get_user_history(username)
+
+    def iter_records(self):
+        """Yield (username, record) for every stored record"""
+        for username, records in self._load().items():
+            for record in records:
+                yield username, record
+
+    def count(self):
+        """Total number of stored records"""
+        return sum(len(records) for records in self._load().values())
+
+
+class SQLiteHistoryStore:
+    """Append-only SQLite backend with a per-user index
+
+    Appends are a single INSERT and reading a user's history only touches
+    that user's rows through the (username, id) index. WAL journaling lets
+    readers proceed while a writer holds the lock.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            date TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_predictions_user
+            ON predictions (username, id);
+    """
+
+    # Seconds a writer waits for another writer's transaction
+    BUSY_TIMEOUT = 30
+
+    def __init__(self, path=HISTORY_DB_FILE):
+        self.path = path
+        # Streamlit serves each session on its own thread, and sqlite3
+        # connections must not be shared across threads
+        self._local = threading.local()
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, username, record):
+        """Add one record ({'date': ..., 'data': ...}) to a user's history"""
+        self.append_many([(username, record)])
+
+    def append_many(self, rows):
+        """Add many (username, record) pairs in one transaction"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO predictions (username, date, data) VALUES (?, ?, ?)",
+                ((username, record['date'], json.dumps(record['data']))
+                 for username, record in rows)
+            )
+
+    def get_user_history(self, username):
+        """Get a user's records, oldest first"""
+        cursor = self._connect().execute(
+            "SELECT date, data FROM predictions WHERE username = ? ORDER BY id",
+            (username,)
+        )
+        return [{'date': date, 'data': json.loads(data)} for date, data in cursor]
+
+    def count_user(self, username):
+        """Number of records a user has"""
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM predictions WHERE username = ?", (username,)
+        ).fetchone()[0]
+
+    def get_user_page(self, username, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Get up to limit of a user's records, newest first, skipping offset
+
+        Walks the (username, id) index backwards, so only the rows on the
+        page are read and decoded.
+        """
+        cursor = self._connect().execute(
+            "SELECT date, data FROM predictions WHERE username = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (username, limit, offset)
+        )
+        return [{'date': date, 'data': json.loads(data)} for date, data in cursor]
+
+    def get_user_points(self, username):
+        """(date, probability) for each of a user's records, oldest first
+
+        The probability is extracted inside SQLite, so the rest of each
+        record is never decoded.
+        """
+        cursor = self._connect().execute(
+            "SELECT date, json_extract(data, '$.probability') FROM predictions "
+            "WHERE username = ? ORDER BY id",
+            (username,)
+        )
+        return cursor.fetchall()
+
+    def iter_user_records(self, username):
+        """Yield a user's records, oldest first, without loading them all"""
+        cursor = self._connect().execute(
+            "SELECT date, data FROM predictions WHERE username = ? ORDER BY id",
+            (username,)
+        )
+        for date, data in cursor:
+            yield {'date': date, 'data': json.loads(data)}
+
+    def iter_records(self):
+        """Yield (username, record) for every stored record"""
+        cursor = self._connect().execute(
+            "SELECT username, date, data FROM predictions ORDER BY id"
+        )
+        for username, date, data in cursor:
+            yield username, {'date': date, 'data': json.loads(data)}
+
+    def count(self):
+        """Total number of stored records"""
+        return self._connect().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+BACKENDS = {
+    'json': (JSONHistoryStore, LEGACY_HISTORY_FILE),
+    'sqlite': (SQLiteHistoryStore, HISTORY_DB_FILE),
+}
+
+
+def get_history_store(backend=None, path=None):
+    """Create a history store; backend defaults to $HISTORY_BACKEND or sqlite"""
+    backend = backend or os.environ.get('HISTORY_BACKEND', DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown history backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    store_class, default_path = BACKENDS[backend]
+    return store_class(path or default_path)
+
+
+def migrate_json_history(source, target):
+    """Copy every record from a JSON history file into another store"""
+    records = list(JSONHistoryStore(source).iter_records())
+    if hasattr(target, 'append_many'):
+        target.append_many(records)
+    else:
+        for username, record in records:
+            target.append(username, record)
+    return len(records)
+
+
+def open_history_store(backend=None, path=None, legacy_path=LEGACY_HISTORY_FILE):
+    """Open the history store, importing the legacy JSON file on first use"""
+    store = get_history_store(backend, path)
+    if (not isinstance(store, JSONHistoryStore)
+            and os.path.exists(legacy_path) and store.count() == 0):
+        migrate_json_history(legacy_path, store)
+    return store
+
+
+def main():
+    """Migrate the legacy JSON history file into another backend"""
+    parser = argparse.ArgumentParser(description="Migrate prediction history from JSON")
+    parser.add_argument('--source', default=LEGACY_HISTORY_FILE, help="Legacy JSON history file")
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=sorted(BACKENDS), help="Target backend")
+    parser.add_argument('--target', default=None, help="Target store path")
+    parser.add_argument('--force', action='store_true', help="Migrate even if the target is not empty")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"Source file not found: {args.source}")
+        return
+
+    target = get_history_store(args.backend, args.target)
+    if target.count() and not args.force:
+        print(f"Target {target.path} already holds {target.count()} records; use --force to append anyway.")
+        return
+
+    migrated = migrate_json_history(args.source, target)
+    print(f"Migrated {migrated} records from {args.source} to {target.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Hyperparameter Search
+Successive halving over each model's search space with a persistent trial cache
+"""
+
+import hashlib
+import json
+import math
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, ParameterSampler, cross_val_score
+
+from storage import read_json, update_json
+
+SEARCH_CACHE_FILE = 'search_cache.json'
+
+# Candidate hyperparameters per model (names match train_models)
+SEARCH_SPACES = {
+    'Logistic Regression': {
+        'C': [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0],
+        'class_weight': [None, 'balanced'],
+    },
+    'Decision Tree': {
+        'max_depth': [2, 3, 4, 5, 6, 8, None],
+        'min_samples_leaf': [1, 2, 5, 10, 20],
+        'class_weight': [None, 'balanced'],
+    },
+    'Random Forest': {
+        'n_estimators': [25, 50, 100, 200],
+        'max_depth': [3, 5, 8, None],
+        'min_samples_leaf': [1, 2, 5],
+        'max_features': ['sqrt', 0.5],
+    },
+    'Gradient Boosting': {
+        'n_estimators': [50, 100, 200],
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_depth': [2, 3, 4],
+        'subsample': [0.8, 1.0],
+    },
+    'SVM': {
+        'C': [0.1, 0.3, 1.0, 3.0, 10.0],
+        'gamma': ['scale', 0.01, 0.03, 0.1],
+    },
+}
+
+
+def data_fingerprint(X, y):
+    """Hash of the training data, so cached trials are only reused for the same data"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def _trial_key(name, params, budget, cv, metric, fingerprint):
+    return json.dumps([name, params, budget, cv, metric, fingerprint], sort_keys=True)
+
+
+def _evaluate(estimator, params, X, y, cv, metric):
+    """Mean CV score of one configuration; NaN if it fails to fit"""
+    model = clone(estimator).set_params(**params)
+    scores = cross_val_score(model, X, y, cv=cv, scoring=metric, error_score=np.nan)
+    return float(np.mean(scores))
+
+
+def successive_halving(name, estimator, space, X, y, metric='f1', n_candidates=16, eta=3,
+                       cv=3, n_jobs=-1, cache=None, fingerprint=None, random_state=42):
+    """Search one model's space with successive halving
+
+    All candidates start on a small random subsample of the training data;
+    after each round only the best 1/eta survive and the sample budget grows
+    eta-fold, up to the full training set. Returns (best_params, best_score,
+    trials) where trials lists every (round, budget, params, score).
+    """
+    grid_size = len(ParameterGrid(space))
+    candidates = list(ParameterSampler(space, n_iter=min(n_candidates, grid_size),
+                                       random_state=random_state))
+    cache = {} if cache is None else cache
+    fingerprint = fingerprint or data_fingerprint(X, y)
+
+    n_samples = len(y)
+    n_rounds = max(1, math.ceil(math.log(len(candidates), eta)))
+    budget = min(n_samples, max(cv * 10, n_samples // eta ** n_rounds))
+    order = np.random.RandomState(random_state).permutation(n_samples)
+
+    trials = []
+    round_number = 0
+    while True:
+        subset = order[:budget]
+        keys = [_trial_key(name, params, budget, cv, metric, fingerprint) for params in candidates]
+        pending = [i for i, key in enumerate(keys) if key not in cache]
+
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(_evaluate)(estimator, candidates[i], X[subset], y[subset], cv, metric)
+            for i in pending
+        )
+        for i, score in zip(pending, scores):
+            cache[keys[i]] = score
+
+        round_scores = [cache[key] for key in keys]
+        for params, score in zip(candidates, round_scores):
+            trials.append((round_number, budget, params, score))
+
+        if len(candidates) == 1 or budget == n_samples:
+            break
+
+        # Keep the best 1/eta; failed fits (NaN) rank last
+        ranking = np.argsort([-np.inf if np.isnan(s) else s for s in round_scores])[::-1]
+        survivors = max(1, math.ceil(len(candidates) / eta))
+        candidates = [candidates[i] for i in ranking[:survivors]]
+        budget = min(n_samples, budget * eta)
+        round_number += 1
+
+    final = [(score, params) for rnd, _, params, score in trials if rnd == round_number]
+    best_score, best_params = max(final, key=lambda item: -np.inf if np.isnan(item[0]) else item[0])
+    return best_params, best_score, trials
+
+
+def tune_models(models, X_train, y_train, metric='f1', n_candidates=16, eta=3, cv=3,
+                n_jobs=-1, cache_path=SEARCH_CACHE_FILE):
+    """Return a copy of models with each estimator set to its best found parameters
+
+    Models without a search space are returned unchanged. Scores are cached
+    in cache_path, so a rerun on the same data only evaluates new trials.
+    """
+    X_train = np.asarray(X_train)
+    y_train = np.asarray(y_train)
+    fingerprint = data_fingerprint(X_train, y_train)
+    cache = read_json(cache_path)
+    cached_before = len(cache)
+
+    tuned = {}
+    for name, estimator in models.items():
+        if name not in SEARCH_SPACES:
+            tuned[name] = estimator
+            continue
+
+        start = time.perf_counter()
+        best_params, best_score, trials = successive_halving(
+            name, estimator, SEARCH_SPACES[name], X_train, y_train, metric=metric,
+            n_candidates=n_candidates, eta=eta, cv=cv, n_jobs=n_jobs,
+            cache=cache, fingerprint=fingerprint
+        )
+        tuned[name] = clone(estimator).set_params(**best_params)
+
+        print(f"{name}: best {metric} {best_score:.4f} with {best_params}")
+        print(f"  {len(trials)} trials in {time.perf_counter() - start:.2f}s")
+
+    # Merge with entries other runs may have written meanwhile
+    update_json(cache_path, lambda stored: stored.update(cache))
+    print(f"Trial cache: {len(cache) - cached_before} new trials, {cached_before} already cached ({cache_path})")
+
+    return tuned
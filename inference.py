@@ -0,0 +1,159 @@
+"""
+Diabetes Prediction Inference
+Shared artifact loading and feature preparation for the apps and batch scoring
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+
+# Artifact files written by train_model.py / train_model_offline.py
+MODEL_FILE = 'diabetes_model.pkl'
+SCALER_FILE = 'scaler.pkl'
+MODEL_INFO_FILE = 'model_info.pkl'
+
+# Fused scaler+model artifact and the manifest that points at it
+MANIFEST_FILE = 'model_manifest.json'
+PIPELINE_PREFIX = 'diabetes_pipeline_'
+
+# Set to 0 to refuse pickled artifacts and load only safe (pickle-free) ones
+ALLOW_PICKLE_ENV = 'ALLOW_PICKLE'
+
+# Feature order the scaler and model were fitted with
+FEATURE_COLUMNS = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+                   'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+
+# Plausible (low, high) per feature, in FEATURE_COLUMNS order
+TYPICAL_RANGES = [(0, 15), (50, 200), (40, 110), (10, 60), (15, 500), (18, 50), (0.1, 2.0), (21, 80)]
+
+# Columns where zero is an impossible value and means "missing"
+ZERO_COLUMNS = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
+
+# Probability at or above which a patient is classed as diabetic
+DEFAULT_THRESHOLD = 0.5
+
+
+class ArtifactError(Exception):
+    """Raised when a model artifact does not match its manifest"""
+
+
+def load_manifest(directory='.'):
+    """Load the fused-artifact manifest, or None if training has not written one"""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def pickle_allowed():
+    """False when $ALLOW_PICKLE is 0, so only safe artifacts are loaded"""
+    return os.environ.get(ALLOW_PICKLE_ENV, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def load_pipeline(manifest, directory='.', safe=True):
+    """Load and verify the fused artifact named in a manifest
+
+    Uses the manifest's safe artifact (JSON header and memory-mapped .npy
+    arrays, see safe_artifact.py) when there is one and safe is True, and
+    unpickles the fused estimator otherwise. Returns (model, scaler, model_info); scaler
+    is None when it is folded into the model, so callers pass the raw
+    features straight through.
+    """
+    if manifest['feature_order'] != FEATURE_COLUMNS:
+        raise ArtifactError(f"Unexpected feature order in manifest: {manifest['feature_order']}")
+
+    if safe and manifest.get('safe_artifact'):
+        from safe_artifact import read_artifact
+
+        model, scaler = read_artifact(os.path.join(directory, manifest['safe_artifact']), manifest['safe_sha256'])
+        return model, scaler, dict(manifest['model_info'], artifact_sha256=manifest['safe_sha256'])
+
+    if not pickle_allowed():
+        raise ArtifactError(f"{manifest['artifact']} is pickled and {ALLOW_PICKLE_ENV}=0")
+    with open(os.path.join(directory, manifest['artifact']), 'rb') as f:
+        payload = f.read()
+    sha256 = hashlib.sha256(payload).hexdigest()
+    if sha256 != manifest['sha256']:
+        raise ArtifactError(f"{manifest['artifact']} does not match its manifest hash")
+
+    model_info = dict(manifest['model_info'], artifact_sha256=sha256)
+    return pickle.loads(payload), None, model_info
+
+
+def load_artifacts():
+    """Load the trained model, scaler and model info
+
+    Prefers the artifact described by the manifest and falls back to the
+    separate pickle files written by older training runs (unless
+    $ALLOW_PICKLE is 0). model_info gets the artifact's sha256 as
+    'artifact_sha256' either way.
+    """
+    manifest = load_manifest()
+    if manifest is not None:
+        return load_pipeline(manifest)
+    if not pickle_allowed():
+        if os.path.exists(MODEL_FILE):
+            raise ArtifactError(f"Only pickled artifacts were found and {ALLOW_PICKLE_ENV}=0; "
+                                f"run 'python safe_artifact.py --convert'")
+        return None, None, None
+    try:
+        with open(MODEL_FILE, 'rb') as f:
+            payload = f.read()
+        with open(SCALER_FILE, 'rb') as f:
+            scaler = pickle.load(f)
+        with open(MODEL_INFO_FILE, 'rb') as f:
+            model_info = pickle.load(f)
+        model_info = dict(model_info, artifact_sha256=hashlib.sha256(payload).hexdigest())
+        return pickle.loads(payload), scaler, model_info
+    except FileNotFoundError:
+        return None, None, None
+
+
+def dummy_rows(n, seed=0):
+    """n synthetic raw feature rows within TYPICAL_RANGES, for checks and warm-up"""
+    low, high = np.array(TYPICAL_RANGES, dtype=np.float64).T
+    return np.random.default_rng(seed).uniform(low, high, size=(n, len(FEATURE_COLUMNS)))
+
+
+def get_fill_values(scaler, model_info):
+    """Values used to fill missing features at scoring time
+
+    Training records the medians it imputed with; models trained before that
+    fall back to the scaler means, which were fitted on the imputed data.
+    Fused artifacts always carry the medians.
+    """
+    medians = model_info.get('feature_medians')
+    if medians:
+        return {column: medians[column] for column in FEATURE_COLUMNS}
+    return {column: float(mean) for column, mean in zip(FEATURE_COLUMNS, scaler.mean_)}
+
+
+def clean_features(df, fill_values):
+    """Apply the training zero-to-median cleaning and return features in model order"""
+    X = df[FEATURE_COLUMNS].astype(float)
+    X[ZERO_COLUMNS] = X[ZERO_COLUMNS].replace(0, float('nan'))
+    return X.fillna(fill_values)
+
+
+def get_threshold(model_info):
+    """Decision threshold stored with the model, or the default"""
+    return model_info.get('decision_threshold', DEFAULT_THRESHOLD)
+
+
+def predict(model, scaler, X, threshold=DEFAULT_THRESHOLD):
+    """Scale X and run the model once
+
+    The class is derived from the positive-class probability instead of a
+    separate model.predict() call, so both outputs always agree. scaler is
+    None for fused artifacts.
+    Returns (predictions, probabilities) as arrays with one entry per row.
+    """
+    if scaler is not None:
+        X = scaler.transform(X)
+    probabilities = model.predict_proba(X)[:, 1]
+    predictions = (probabilities >= threshold).astype(int)
+    return predictions, probabilities
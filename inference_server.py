@@ -0,0 +1,302 @@
+"""
+Diabetes Prediction REST Service
+Headless HTTP inference using the same artifacts as the Streamlit apps
+
+Endpoints:
+    GET  /health              liveness, readiness and loaded model name
+    GET  /ready               200 once the model is loaded and warmed up, else 503
+    GET  /model               model info (metrics, threshold, ...)
+    GET  /metrics             micro-batching and model reload statistics
+    GET  /metrics/prometheus  per-stage latency histograms (Prometheus text)
+    POST /predict             one patient:  {"Glucose": 120, ...}
+    POST /predict/batch       many patients: {"instances": [{...}, ...]}
+    POST /model/rollback      serve the previously loaded model again
+"""
+
+import argparse
+import json
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from inference import FEATURE_COLUMNS, ArtifactError
+from instrumentation import METRICS, timed
+from microbatch import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from model_registry import ModelRegistry
+from warmup import Warmup
+
+MAX_BATCH_SIZE = 10000
+
+
+class ServiceUnavailable(Exception):
+    """Raised when no model version can score yet (warming up or failed to load)"""
+
+
+class PredictionService:
+    """Scores feature rows with the loaded artifacts
+
+    Single-row requests from concurrent clients are coalesced by a
+    MicroBatcher; batch requests are already vectorized and go to a
+    bounded worker pool. The model comes from a ModelRegistry, so
+    retrained artifacts are picked up without a restart; fixed artifacts
+    passed in are served as they are.
+
+    The registry is loaded and warmed up by a Warmup. With background=True
+    the constructor returns at once and requests wait for warm-up to
+    finish; ready() tells load balancers when to send traffic.
+    """
+
+    def __init__(self, artifacts=None, workers=4, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, background=False):
+        if artifacts is not None:
+            factory = lambda: ModelRegistry(loader=lambda: artifacts, watch_paths=(), poll_interval=None,
+                                            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        else:
+            factory = lambda: ModelRegistry(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.warmup = Warmup(factory)
+        if not background:
+            registry = self.warmup.registry()
+            if registry is None or registry.current() is None:
+                raise FileNotFoundError("Model not found! Please run 'train_model.py' first.")
+            if self.warmup.error:
+                raise ArtifactError(self.warmup.error)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='predict')
+
+    @property
+    def registry(self):
+        """The model registry, waiting for warm-up to finish"""
+        registry = self.warmup.registry()
+        if registry is None:
+            raise ArtifactError(self.warmup.error or "Model registry could not be created")
+        return registry
+
+    def ready(self):
+        return self.warmup.status()['ready']
+
+    def health(self):
+        """Liveness payload; never waits for warm-up"""
+        registry = self.warmup.registry(timeout=0)
+        version = registry.current() if registry is not None else None
+        return dict(self.warmup.status(), status='ok',
+                    model=version.model_info['model_name'] if version else None)
+
+    def current(self):
+        """The ModelVersion to score with; raises ServiceUnavailable if there is none"""
+        try:
+            version = self.registry.current()
+        except ArtifactError as e:
+            raise ServiceUnavailable(str(e))
+        if version is None:
+            raise ServiceUnavailable(self.warmup.error or "No model is loaded")
+        return version
+
+    @property
+    def model_info(self):
+        return self.current().model_info
+
+    @timed('inference.single')
+    def score_one(self, instance):
+        """Score one feature dict; returns (prediction, probability)"""
+        X = to_matrix([instance])
+        return self.current().batcher.predict(X[0])
+
+    @timed('inference.batch')
+    def score(self, instances):
+        """Score a list of feature dicts; returns (predictions, probabilities)"""
+        X = to_matrix(instances)
+        return self.pool.submit(self.current().predictor.predict, X).result()
+
+    def metrics(self):
+        return dict(self.current().batcher.stats(), registry=self.registry.stats(),
+                    warmup=self.warmup.status())
+
+    def close(self):
+        self.warmup.ready.wait()
+        if self.warmup.registry() is not None:
+            self.warmup.registry().close()
+        self.pool.shutdown()
+
+
+def to_matrix(instances):
+    """Build the model-ordered float matrix, rejecting missing, non-numeric or non-finite values"""
+    X = np.empty((len(instances), len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, instance in enumerate(instances):
+        if not isinstance(instance, dict):
+            raise ValueError(f"Instance {i} must be a JSON object")
+        missing = [column for column in FEATURE_COLUMNS if column not in instance]
+        if missing:
+            raise ValueError(f"Instance {i} is missing: {', '.join(missing)}")
+        try:
+            X[i] = [float(instance[column]) for column in FEATURE_COLUMNS]
+        except (TypeError, ValueError):
+            raise ValueError(f"Instance {i} has a non-numeric feature value")
+    # json.loads accepts NaN and Infinity, which models would score silently
+    finite = np.isfinite(X).all(axis=1)
+    if not finite.all():
+        raise ValueError(f"Instance {int(np.argmin(finite))} has a non-finite feature value")
+    return X
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """HTTP front end; the service is attached to the server"""
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def _handle(self, route):
+        """Run a route, mapping errors to 400 (bad input), 503 (no model) or 500"""
+        try:
+            route(self.server.service)
+        except ValueError as e:  # includes malformed JSON
+            self._send(400, {'error': str(e)})
+        except (ServiceUnavailable, ArtifactError) as e:
+            self._send(503, dict(self.server.service.warmup.status(), error=str(e)))
+        except Exception as e:
+            self.log_error("Error handling %s: %r", self.path, e)
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def _get(self, service):
+        if self.path == '/health':
+            self._send(200, service.health())
+        elif self.path == '/ready':
+            self._send(200 if service.ready() else 503, service.warmup.status())
+        elif self.path == '/model':
+            self._send(200, service.model_info)
+        elif self.path == '/metrics':
+            self._send(200, service.metrics())
+        elif self.path == '/metrics/prometheus':
+            body = METRICS.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def _post(self, service):
+        payload = self._read_json()
+        if self.path == '/predict':
+            prediction, probability = service.score_one(payload)
+            self._send(200, {'prediction': prediction, 'probability': probability})
+        elif self.path == '/model/rollback':
+            registry = service.registry
+            try:
+                version = registry.rollback()
+            except ArtifactError as e:
+                self._send(409, {'error': str(e)})
+                return
+            self._send(200, version.describe())
+        elif self.path == '/predict/batch':
+            instances = payload.get('instances') if isinstance(payload, dict) else payload
+            if not isinstance(instances, list) or not instances:
+                raise ValueError("Expected a non-empty 'instances' list")
+            if len(instances) > MAX_BATCH_SIZE:
+                self._send(413, {'error': f"At most {MAX_BATCH_SIZE} instances per request"})
+                return
+            predictions, probabilities = service.score(instances)
+            self._send(200, {'predictions': predictions.tolist(),
+                             'probabilities': probabilities.tolist()})
+        else:
+            self._send(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(host='127.0.0.1', port=8000, workers=4, artifacts=None, quiet=False,
+                  max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, background_warmup=False):
+    """Create (but do not start) the HTTP server"""
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    server.service = PredictionService(artifacts, workers, max_batch_size, max_wait_ms, background_warmup)
+    server.quiet = quiet
+    return server
+
+
+class RemoteModel:
+    """Model stand-in that scores through a running prediction service
+
+    Implements predict_proba so it drops into inference.predict() with
+    scaler=None, letting the Streamlit apps use the service transparently.
+    """
+
+    def __init__(self, url, timeout=10):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload, default=_json_default).encode()
+        request = urllib.request.Request(self.url + path, data=data,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def model_info(self):
+        return self._request('/model')
+
+    def predict_proba(self, X):
+        instances = [dict(zip(FEATURE_COLUMNS, map(float, row))) for row in np.asarray(X)]
+        probabilities = np.asarray(self._request('/predict/batch', {'instances': instances})['probabilities'])
+        return np.column_stack([1 - probabilities, probabilities])
+
+
+def load_remote_model(url):
+    """(model, scaler, model_info) backed by a prediction service, like load_artifacts()"""
+    model = RemoteModel(url)
+    return model, None, model.model_info()
+
+
+def remote_artifact_hash(url):
+    """Hash of the model a prediction service is serving, for ModelRegistry to poll"""
+    return RemoteModel(url).model_info().get('artifact_sha256')
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Serve diabetes predictions over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent inference workers")
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE, help="Rows per micro-batch")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS, help="Max time to wait for a micro-batch to fill")
+    args = parser.parse_args()
+
+    # Accept connections at once; /ready turns 200 when the model is warm
+    server = create_server(args.host, args.port, args.workers, max_batch_size=args.max_batch_size,
+                           max_wait_ms=args.max_wait_ms, background_warmup=True)
+    print(f"Serving on http://{args.host}:{args.port} (model warming up, see GET /ready)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Instrumentation
+Per-stage timing histograms, Prometheus text export and sampled cProfile runs
+"""
+
+import argparse
+import contextlib
+import cProfile
+import functools
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from storage import atomic_write_text
+
+# Histogram upper bounds in seconds (Prometheus' defaults, extended below 5ms)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_NAME = 'app_stage_duration_seconds'
+PROFILE_DIR = 'profiles'
+
+# Seconds between rewrites of the metrics file
+EXPORT_INTERVAL = 10.0
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus expects"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative(self):
+        running, result = 0, []
+        for count in self.counts:
+            running += count
+            result.append(running)
+        return result
+
+
+class StageMetrics:
+    """Thread-safe histograms keyed by stage name"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        spans = getattr(self._local, 'spans', None)
+        if spans is not None:
+            spans.append((stage, seconds))
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Time the body of a with block as one observation of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        """Decorator timing every call of a function as stage"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextlib.contextmanager
+    def trace(self):
+        """Collect the (stage, seconds) spans observed in this thread during the block"""
+        previous = getattr(self._local, 'spans', None)
+        spans = self._local.spans = []
+        try:
+            yield spans
+        finally:
+            self._local.spans = previous
+
+    def snapshot(self):
+        """{stage: (cumulative bucket counts, sum, count)}"""
+        with self._lock:
+            return {stage: (h.cumulative(), h.total, h.count) for stage, h in self._histograms.items()}
+
+    def render_prometheus(self, name=METRIC_NAME):
+        """All histograms in the Prometheus text exposition format"""
+        lines = [f"# HELP {name} Time spent per stage.", f"# TYPE {name} histogram"]
+        bounds = [repr(float(b)) for b in self.buckets] + ['+Inf']
+        for stage, (cumulative, total, count) in sorted(self.snapshot().items()):
+            for bound, value in zip(bounds, cumulative):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {value}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# Shared by every module of a process
+METRICS = StageMetrics()
+timer = METRICS.timer
+timed = METRICS.timed
+trace = METRICS.trace
+
+
+def write_prometheus(path, metrics=METRICS):
+    """Atomically write the metrics file (for node_exporter's textfile collector)"""
+    atomic_write_text(path, metrics.render_prometheus())
+
+
+_last_export = 0.0
+
+
+def export_if_due(path=None, interval=EXPORT_INTERVAL):
+    """Rewrite $METRICS_FILE at most every interval seconds; no-op when unset"""
+    global _last_export
+    path = path or os.environ.get('METRICS_FILE')
+    if not path:
+        return False
+    # Check-and-set under the registry lock so concurrent script runs export once;
+    # the write itself takes the lock again (through snapshot), so it stays outside
+    with METRICS._lock:
+        now = time.monotonic()
+        if now - _last_export < interval:
+            return False
+        _last_export = now
+    write_prometheus(path)
+    return True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host='127.0.0.1', metrics=METRICS):
+    """Serve GET /metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+
+def profile_rate():
+    """Fraction of profiled runs from $PROFILE_RATE (0 = off)"""
+    try:
+        return float(os.environ.get('PROFILE_RATE', 0))
+    except ValueError:
+        return 0.0
+
+
+@contextlib.contextmanager
+def sampled_profile(name, rate=None, directory=PROFILE_DIR):
+    """Run the block under cProfile for a random fraction of calls
+
+    Profiles are written to directory/<name>-<timestamp>.prof; open them
+    with `python -m pstats` or snakeviz. rate defaults to $PROFILE_RATE,
+    so profiling is off unless asked for.
+    """
+    rate = profile_rate() if rate is None else rate
+    if rate <= 0 or random.random() >= rate:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler is active in this process
+        yield None
+        return
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+                                                    f"-{threading.get_ident()}.prof"))
+
+
+def main():
+    """Summarize saved cProfile samples"""
+    import pstats
+
+    parser = argparse.ArgumentParser(description="Show the hottest functions across sampled profiles")
+    parser.add_argument('--directory', default=PROFILE_DIR, help="Directory of .prof files")
+    parser.add_argument('--top', type=int, default=25, help="Functions to show")
+    parser.add_argument('--sort', default='cumulative', help="pstats sort key")
+    args = parser.parse_args()
+
+    files = []
+    if os.path.isdir(args.directory):
+        files = sorted(os.path.join(args.directory, f) for f in os.listdir(args.directory) if f.endswith('.prof'))
+    if not files:
+        print(f"No profiles in {args.directory}. Set PROFILE_RATE=0.05 to sample 5% of reruns.")
+        return
+    print(f"{len(files)} profile(s) from {args.directory}")
+    stats = pstats.Stats(*files)
+    stats.sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
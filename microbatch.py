@@ -0,0 +1,156 @@
+"""
+Micro-Batching Scheduler
+Coalesce concurrent single-row predictions into one vectorized model call
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+# Queueing delays kept for percentile metrics
+DELAY_WINDOW = 10000
+
+
+class MicroBatcher:
+    """Collects rows from many threads and scores them together
+
+    The worker takes every waiting request (up to max_batch_size). A lone
+    request is scored immediately; when several were queued, callers are
+    submitting concurrently, so it keeps collecting for up to max_wait_ms.
+    The rows are stacked into one matrix for a single score_fn call. Each caller gets its
+    own (prediction, probability) back through a Future. If the batch call
+    fails, its rows are rescored one at a time so only the failing request
+    sees the error.
+    """
+
+    def __init__(self, score_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._delays = []
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='microbatch', daemon=True)
+        self._worker.start()
+
+    def submit(self, row):
+        """Queue one feature row; returns a Future of (prediction, probability)
+
+        After close() rows are scored directly in the calling thread, so
+        callers still holding a retired batcher keep getting answers.
+        """
+        future = Future()
+        row = np.asarray(row, dtype=np.float64)
+        with self._lock:
+            if not self._closed:
+                self._queue.put((row, future, time.perf_counter()))
+                return future
+        predictions, probabilities = self.score_fn(row.reshape(1, -1))
+        future.set_result((int(predictions[0]), float(probabilities[0])))
+        return future
+
+    def predict(self, row, timeout=None):
+        """Score one feature row, blocking until its batch has run"""
+        return self.submit(row).result(timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        # Take whatever is already queued; a lone request is scored at once
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                return batch
+            batch.append(item)
+        if len(batch) == 1:
+            return batch
+
+        # Other callers are submitting concurrently: linger for more of them
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            rows, futures, enqueued = zip(*batch)
+            try:
+                predictions, probabilities = self.score_fn(np.vstack(rows))
+            except Exception as e:
+                if len(batch) == 1:
+                    futures[0].set_exception(e)
+                else:
+                    self._score_each(rows, futures)
+            else:
+                for i, future in enumerate(futures):
+                    future.set_result((int(predictions[i]), float(probabilities[i])))
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._delays.extend(started - t for t in enqueued)
+                del self._delays[:-DELAY_WINDOW]
+
+    def _score_each(self, rows, futures):
+        # One bad row failed the batch; rescore alone so only its caller gets the error
+        for row, future in zip(rows, futures):
+            try:
+                predictions, probabilities = self.score_fn(row.reshape(1, -1))
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result((int(predictions[0]), float(probabilities[0])))
+
+    def stats(self):
+        """Batch fill and queueing-delay metrics since start"""
+        with self._lock:
+            delays = np.array(self._delays) * 1000 if self._delays else np.zeros(1)
+            mean_batch = self._requests / self._batches if self._batches else 0.0
+            return {
+                'requests': self._requests,
+                'batches': self._batches,
+                'mean_batch_size': mean_batch,
+                'batch_fill': mean_batch / self.max_batch_size,
+                'queue_delay_p50_ms': float(np.percentile(delays, 50)),
+                'queue_delay_p99_ms': float(np.percentile(delays, 99)),
+                'queue_depth': self._queue.qsize(),
+            }
+
+    def close(self):
+        """Stop the worker after the requests already queued"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join()
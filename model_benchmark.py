@@ -0,0 +1,82 @@
+"""
+Model Serving Benchmarks
+Measure inference latency, size and load time of candidate models and
+select the winner under a latency policy
+"""
+
+import pickle
+import time
+
+import numpy as np
+
+
+def _percentile_ms(timings, q):
+    return float(np.percentile(timings, q) * 1000)
+
+
+def benchmark_model(model, X_sample, repeats=200, batch_size=1000):
+    """Serving costs of one fitted model on already-scaled rows
+
+    Returns a dict with single-row p50/p99 latency, batched throughput,
+    pickled size and unpickle time.
+    """
+    X_sample = np.asarray(X_sample)
+
+    # Single-row latency, the path every Streamlit prediction takes
+    timings = []
+    for i in range(repeats):
+        row = X_sample[i % len(X_sample)].reshape(1, -1)
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+
+    # Batched latency on batch_size rows
+    batch = X_sample[np.arange(batch_size) % len(X_sample)]
+    batch_timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        model.predict_proba(batch)
+        batch_timings.append(time.perf_counter() - start)
+    batch_seconds = min(batch_timings)
+
+    payload = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+    start = time.perf_counter()
+    pickle.loads(payload)
+    load_time = time.perf_counter() - start
+
+    return {
+        'single_row_p50_ms': _percentile_ms(timings, 50),
+        'single_row_p99_ms': _percentile_ms(timings, 99),
+        'batch_size': batch_size,
+        'batch_ms': batch_seconds * 1000,
+        'rows_per_second': batch_size / batch_seconds,
+        'model_size_kb': len(payload) / 1024,
+        'load_time_ms': load_time * 1000,
+    }
+
+
+def benchmark_models(results, X_sample, repeats=200):
+    """Benchmark every model in a train_models() results dict"""
+    return {name: benchmark_model(result['model'], X_sample, repeats=repeats)
+            for name, result in results.items()}
+
+
+def select_model(results, benchmarks, metric='f1_score', max_p99_ms=None, tolerance=0.0):
+    """Pick the model to deploy
+
+    Candidates over the single-row p99 budget (max_p99_ms) are dropped; if
+    none fit, the fastest model wins. Among the rest, any model within
+    tolerance of the best metric counts as tied and the fastest tied model
+    is chosen. With the defaults this is simply the best metric.
+    """
+    candidates = list(results)
+    if max_p99_ms is not None:
+        within_budget = [name for name in candidates
+                         if benchmarks[name]['single_row_p99_ms'] <= max_p99_ms]
+        if not within_budget:
+            return min(candidates, key=lambda name: benchmarks[name]['single_row_p99_ms'])
+        candidates = within_budget
+
+    best_score = max(results[name][metric] for name in candidates)
+    tied = [name for name in candidates if results[name][metric] >= best_score - tolerance]
+    return min(tied, key=lambda name: (benchmarks[name]['single_row_p99_ms'], -results[name][metric]))
@@ -0,0 +1,133 @@
+"""
+Fused Model Export
+Fold the scaler into the model and write a single versioned artifact
+"""
+
+import copy
+import glob
+import hashlib
+import os
+import pickle
+from datetime import datetime
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from inference import (FEATURE_COLUMNS, MANIFEST_FILE, MODEL_FILE, MODEL_INFO_FILE, PIPELINE_PREFIX,
+                       SCALER_FILE, ArtifactError, dummy_rows)
+from safe_artifact import remove_stale, write_artifact
+from storage import atomic_write_json, read_json
+
+# Raw feature rows the safe artifact is checked against when no sample is given
+CHECK_ROWS = 1000
+
+MANIFEST_VERSION = 1
+
+
+def fuse_scaler(model, scaler):
+    """Return (estimator, fused) that accepts unscaled features
+
+    Linear models absorb the scaler into their weights:
+        w' = w / scale,  b' = b - w' . mean
+    so scoring is a single dot product. Other models are wrapped in a
+    Pipeline with the scaler in front.
+    """
+    if isinstance(model, (LogisticRegression, SGDClassifier)):
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(model.coef_.shape[1])
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(model.coef_.shape[1])
+
+        fused = copy.deepcopy(model)
+        fused.coef_ = model.coef_ / scale
+        fused.intercept_ = model.intercept_ - fused.coef_ @ mean
+        if hasattr(scaler, 'feature_names_in_'):
+            fused.feature_names_in_ = scaler.feature_names_in_
+        return fused, True
+
+    return Pipeline([('scaler', scaler), ('model', model)]), False
+
+
+def save_pipeline(model, scaler, model_info, directory='.', X_check=None):
+    """Write the fused artifact and its manifest; returns the manifest
+
+    The artifact file name contains its hash and the manifest is replaced
+    last with an atomic rename, so readers always see a complete, matching
+    pair. Supported model families also get a pickle-free safe artifact,
+    checked against the estimator on X_check (raw features), which loaders
+    prefer. The previous artifacts and their manifest entry are kept for
+    rollback_manifest().
+    """
+    estimator, fused = fuse_scaler(model, scaler)
+    payload = pickle.dumps(estimator, protocol=pickle.HIGHEST_PROTOCOL)
+    sha256 = hashlib.sha256(payload).hexdigest()
+
+    artifact = f"{PIPELINE_PREFIX}{sha256[:12]}.pkl"
+    artifact_path = os.path.join(directory, artifact)
+    tmp_path = artifact_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, artifact_path)
+
+    safe = write_artifact(estimator, dummy_rows(CHECK_ROWS) if X_check is None else X_check, directory)
+
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    previous_manifest = read_json(manifest_path)
+    previous_manifest.pop('previous', None)
+    previous = previous_manifest.get('artifact')
+    previous_safe = previous_manifest.get('safe_artifact')
+
+    manifest = {
+        'format_version': MANIFEST_VERSION,
+        'artifact': artifact,
+        'sha256': sha256,
+        'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'feature_order': FEATURE_COLUMNS,
+        'fused_scaler': fused,
+        'model_info': model_info,
+        'safe_artifact': None,
+        'safe_sha256': None,
+        **(safe or {}),
+        'previous': previous_manifest or None,
+    }
+    atomic_write_json(manifest_path, manifest)
+
+    # Drop artifacts older than the previous one
+    keep = {artifact, previous}
+    for path in glob.glob(os.path.join(directory, f"{PIPELINE_PREFIX}*.pkl")):
+        if os.path.basename(path) not in keep:
+            os.remove(path)
+    remove_stale(directory, {manifest['safe_artifact'], previous_safe})
+
+    return manifest
+
+
+def save_legacy_pickles(model, scaler, model_info, directory='.'):
+    """Write the separate model, scaler and info pickles of older releases
+
+    Nothing in this repo needs them once a manifest exists; they are only
+    for external tools that still read those files.
+    """
+    for name, obj in ((MODEL_FILE, model), (SCALER_FILE, scaler), (MODEL_INFO_FILE, model_info)):
+        with open(os.path.join(directory, name), 'wb') as f:
+            pickle.dump(obj, f)
+
+
+def rollback_manifest(directory='.'):
+    """Point the manifest back at the previous artifact; returns the new manifest
+
+    The two versions trade places, so rolling back twice restores the
+    newer model.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    manifest = read_json(manifest_path)
+    previous = manifest.pop('previous', None)
+    if not previous:
+        raise ArtifactError("No previous model artifact to roll back to")
+    if not os.path.exists(os.path.join(directory, previous['artifact'])):
+        raise ArtifactError(f"Previous artifact {previous['artifact']} is missing")
+    if previous.get('safe_artifact') and not os.path.isdir(os.path.join(directory, previous['safe_artifact'])):
+        raise ArtifactError(f"Previous artifact {previous['safe_artifact']} is missing")
+
+    rolled_back = dict(previous, previous=manifest)
+    atomic_write_json(manifest_path, rolled_back)
+    return rolled_back
@@ -0,0 +1,235 @@
+"""
+Model Registry
+Hot-reload retrained artifacts without restarting the apps or the service
+"""
+
+import argparse
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from inference import (FEATURE_COLUMNS, MANIFEST_FILE, MODEL_FILE, MODEL_INFO_FILE, SCALER_FILE,
+                       ArtifactError, get_threshold, load_artifacts, load_manifest)
+from fast_predictor import FastPredictor, compiled_max_rows
+from microbatch import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, MicroBatcher
+from model_export import rollback_manifest
+
+WATCH_FILES = (MODEL_FILE, SCALER_FILE, MODEL_INFO_FILE, MANIFEST_FILE)
+DEFAULT_POLL_SECONDS = 2.0
+
+
+class ModelVersion:
+    """One loaded model together with its scorer and micro-batcher"""
+
+    def __init__(self, model, scaler, model_info, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.model = model
+        self.scaler = scaler
+        self.model_info = model_info
+        self.sha256 = model_info.get('artifact_sha256')
+        self.threshold = get_threshold(model_info)
+        self.predictor = FastPredictor(model, scaler, self.threshold, compiled_max_rows(model_info))
+        self.batcher = MicroBatcher(self.predictor.predict, max_batch_size, max_wait_ms)
+        self.loaded_at = time.time()
+
+    def describe(self):
+        return {
+            'model_name': self.model_info['model_name'],
+            'artifact_sha256': self.sha256,
+            'loaded_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.loaded_at)),
+        }
+
+
+def _signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return signature
+
+
+class ModelRegistry:
+    """Serves the current ModelVersion and swaps in retrained ones
+
+    A daemon thread polls the artifact files' mtime and size every
+    poll_interval seconds, so current() never does I/O. A change must hold
+    for two polls in a row (so a training run has finished writing) before
+    a background thread loads the new files, runs a test prediction and
+    swaps the version in under a lock. Artifacts with the same hash as the current one are not
+    reloaded. Callers keep the ModelVersion they were handed, so
+    predictions in flight finish on the model they started with.
+
+    The replaced version is kept for rollback(); the one before that is
+    retired.
+
+    signature is what gets polled: by default the mtime and size of
+    watch_paths; a remote loader passes one that asks the service for its
+    artifact hash instead.
+    """
+
+    def __init__(self, loader=load_artifacts, watch_paths=WATCH_FILES, poll_interval=DEFAULT_POLL_SECONDS,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, signature=None):
+        self.loader = loader
+        self.watch_paths = watch_paths
+        self.signature = signature or (lambda: _signature(self.watch_paths))
+        self.poll_interval = poll_interval
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._lock = threading.Lock()
+        self._current = None
+        self._previous = None
+        self._loading = False
+        self._pending = None
+        self._closed = threading.Event()
+        self.reloads = 0
+        self.last_error = None
+
+        self._signature = self.signature()
+        model, scaler, model_info = self.loader()
+        if model is not None:
+            self._current = self._build(model, scaler, model_info)
+        if poll_interval is not None:
+            # The poller holds a weak reference, so a dropped registry stops polling
+            threading.Thread(target=_poll, args=(weakref.ref(self), self._closed, poll_interval),
+                             name='model-poll', daemon=True).start()
+
+    def _build(self, model, scaler, model_info):
+        return ModelVersion(model, scaler, model_info, self.max_batch_size, self.max_wait_ms)
+
+    def current(self):
+        """The ModelVersion to score with, or None if no model is trained yet"""
+        return self._current
+
+    def check(self):
+        """Start a background reload if the artifact files changed
+
+        Called by the poller thread; returns True if a reload was started.
+        """
+        try:
+            signature = self.signature()  # outside the lock: may be a network call
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+        with self._lock:
+            if signature == self._signature or self._loading:
+                return False
+            if signature != self._pending:
+                # Wait one more poll for the writer to finish
+                self._pending = signature
+                return False
+            self._loading = True
+        threading.Thread(target=self._reload, args=(signature,), name='model-reload', daemon=True).start()
+        return True
+
+    def reload(self):
+        """Load the artifacts now, in the calling thread; returns the current version"""
+        with self._lock:
+            if self._loading:
+                return self._current
+            self._loading = True
+        self._reload(self.signature())
+        return self._current
+
+    def _reload(self, signature):
+        try:
+            model, scaler, model_info = self.loader()
+            if model is None:
+                raise FileNotFoundError("Model artifacts not found")
+            current = self._current
+            if current is not None and current.sha256 and model_info.get('artifact_sha256') == current.sha256:
+                version = None
+            else:
+                version = self._build(model, scaler, model_info)
+                # A model that cannot score a row never goes live
+                version.predictor.predict(np.zeros((1, len(FEATURE_COLUMNS))))
+        except Exception as e:  # keep serving the current version
+            with self._lock:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._loading = False
+            return
+
+        with self._lock:
+            self._signature = signature
+            self._pending = None
+            self._loading = False
+            self.last_error = None
+            if version is None:
+                return
+            retired = self._previous
+            self._previous, self._current = self._current, version
+            self.reloads += 1
+        if retired is not None:
+            retired.batcher.close()
+
+    def rollback(self):
+        """Serve the previous version again; returns it
+
+        The files on disk are not touched, so the model stays rolled back
+        until the artifacts change again.
+        """
+        with self._lock:
+            if self._previous is None:
+                raise ArtifactError("No previous model version to roll back to")
+            self._current, self._previous = self._previous, self._current
+            return self._current
+
+    def stats(self):
+        """Registry status for health and metrics endpoints"""
+        current, previous = self._current, self._previous
+        return {
+            'current': current.describe() if current else None,
+            'previous': previous.describe() if previous else None,
+            'reloads': self.reloads,
+            'reloading': self._loading,
+            'last_error': self.last_error,
+        }
+
+    def close(self):
+        self._closed.set()
+        for version in (self._current, self._previous):
+            if version is not None:
+                version.batcher.close()
+
+
+def _poll(registry_ref, closed, interval):
+    while not closed.wait(interval):
+        registry = registry_ref()
+        if registry is None:
+            return
+        registry.check()
+        del registry
+
+
+def main():
+    """Show or roll back the model version on disk"""
+    parser = argparse.ArgumentParser(description="Inspect or roll back the deployed model artifact")
+    parser.add_argument('--rollback', action='store_true',
+                        help="Point the manifest back at the previous artifact")
+    args = parser.parse_args()
+
+    if args.rollback:
+        manifest = rollback_manifest()
+        print(f"Rolled back to {manifest['artifact']} ({manifest['model_info']['model_name']})")
+        print("Running apps and services pick it up within a few seconds.")
+        return
+
+    manifest = load_manifest()
+    if manifest is None:
+        print("No model manifest found. Please run 'train_model.py' first.")
+        return
+    print(f"Current:  {manifest['artifact']} ({manifest['model_info']['model_name']}, {manifest['created']})")
+    previous = manifest.get('previous')
+    if previous:
+        print(f"Previous: {previous['artifact']} ({previous['model_info']['model_name']}, {previous['created']})")
+    else:
+        print("Previous: none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Static Page Fragments
+Markdown shown with prediction results, prepared once per language
+"""
+
+# Diet plan, meal plan, exercise and warning sections for high-risk results
+EAT_PLANTS_AND_GRAINS = """\
+**🥬 Vegetables (Unlimited):**
+- Leafy greens: Spinach, kale, methi (fenugreek)
+- Broccoli, cauliflower, cabbage
+- Tomatoes, cucumber, capsicum
+- Bitter gourd (karela) - excellent for diabetes
+- Ridge gourd, bottle gourd, pumpkin
+
+**🍎 Fruits (Limited portions):**
+- Berries: Strawberries, blueberries
+- Apple (1 small/day)
+- Guava, papaya
+- Orange (1 small/day)
+- **Avoid:** Mango, banana, grapes (high sugar)
+
+**🌾 Whole Grains:**
+- Brown rice (instead of white rice)
+- Whole wheat roti
+- Oats, quinoa
+- Millets: Ragi, bajra, jowar
+- **Limit:** White rice, maida (refined flour)"""
+
+EAT_PROTEINS_AND_DRINKS = """\
+**🥜 Proteins:**
+- Lentils: Moong dal, masoor dal
+- Chickpeas, kidney beans
+- Fish (salmon, mackerel) - 2-3 times/week
+- Chicken (skinless, grilled)
+- Eggs (boiled)
+- Paneer (cottage cheese) - in moderation
+- Tofu, soya
+
+**🥛 Dairy:**
+- Low-fat milk
+- Plain curd (yogurt)
+- Buttermilk (chaas)
+- **Limit:** Full-fat milk, cheese
+
+**🥤 Beverages:**
+- Water (8-10 glasses/day)
+- Green tea (unsweetened)
+- Herbal teas
+- Buttermilk
+- **Avoid:** Sugary drinks, soda, packaged juices"""
+
+FOODS_TO_AVOID = """\
+---
+#### ❌ **Foods to AVOID:**
+
+<div style="background-color: #ffebee; padding: 15px; border-radius: 10px; border-left: 5px solid #ef5350;">
+
+**🚫 High Sugar Foods:**
+- White sugar, jaggery (limit)
+- Sweets, candies, chocolates
+- Ice cream, pastries, cakes
+- Sweetened beverages, soft drinks
+- Honey (in excess)
+
+**🚫 Refined Carbohydrates:**
+- White bread, maida products
+- White rice (prefer brown rice)
+- Pasta (refined), noodles
+- Biscuits, cookies
+- Packaged snacks, chips
+
+**🚫 Fried & Processed Foods:**
+- Deep-fried foods (samosa, pakora, puri)
+- Fast food (pizza, burger, fries)
+- Processed meats (sausages, salami)
+- Trans fats, vanaspati
+
+**🚫 High-Fat Foods:**
+- Full-fat dairy products
+- Fatty cuts of meat
+- Coconut oil in excess
+- Butter, ghee (limit to 1-2 tsp/day)
+
+</div>"""
+
+BREAKFAST = """\
+**🌅 Breakfast (7-8 AM):**
+- 2 wheat rotis + vegetable curry
+OR
+- 1 bowl oats + nuts
+OR
+- 2 boiled eggs + 1 toast
+- 1 cup green tea (no sugar)
+
+**☕ Mid-Morning (10-11 AM):**
+- 1 fruit (apple/guava)
+OR
+- Handful of nuts (almonds/walnuts)
+- Buttermilk"""
+
+LUNCH_AND_SNACK = """\
+**🍛 Lunch (12-1 PM):**
+- 1-2 rotis (whole wheat)
+- 1 bowl dal (lentils)
+- 1 bowl vegetable curry
+- Salad (unlimited)
+- 1 cup curd
+- **Avoid:** White rice or limit to ½ cup
+
+**🥤 Evening (4-5 PM):**
+- Green tea + roasted chana
+OR
+- Sprouts salad
+OR
+- Vegetable soup"""
+
+DINNER = """\
+**🌙 Dinner (7-8 PM):**
+- 1-2 rotis
+- Grilled chicken/fish OR dal
+- 1 bowl vegetables
+- Salad
+- **Early dinner:** Before 8 PM
+
+**🛏️ Before Bed:**
+- 1 cup warm milk (low-fat)
+- **Avoid:** Late-night snacking"""
+
+EXERCISE_GOAL = """\
+---
+### 🏃 **Recommended Exercise Plan**
+
+<div style="background-color: #e8f5e9; padding: 15px; border-radius: 10px; border-left: 5px solid #66bb6a;">
+
+**⏰ Goal:** At least 150 minutes per week (30 min/day × 5 days)
+
+</div>"""
+
+EXERCISE_TYPES = """\
+**🚶 Aerobic Exercises (Daily):**
+- **Walking:** 30-45 minutes brisk walk
+  - Best: Morning or evening
+  - After meals helps reduce blood sugar
+- **Jogging/Running:** 20-30 minutes
+- **Cycling:** 30-45 minutes
+- **Swimming:** 30 minutes
+- **Dancing:** 30 minutes
+
+**💪 Strength Training (3x/week):**
+- Weight lifting (light weights)
+- Resistance bands
+- Push-ups, squats, lunges
+- Core exercises
+- **Duration:** 20-30 minutes
+
+**🧘 Flexibility (Daily):**
+- Yoga: 20-30 minutes
+- Stretching: 10-15 minutes
+- Pranayama (breathing exercises)"""
+
+EXERCISE_SCHEDULE = """\
+**📅 Weekly Exercise Schedule:**
+
+**Monday:** 30 min walk + 20 min strength
+**Tuesday:** 30 min cycling/jogging
+**Wednesday:** 30 min walk + 20 min yoga
+**Thursday:** 30 min swimming/dancing
+**Friday:** 30 min walk + 20 min strength
+**Saturday:** 45 min brisk walk
+**Sunday:** 30 min yoga/stretching (light)
+
+**⚠️ Important Tips:**
+- Start slowly, increase gradually
+- Check blood sugar before exercise
+- Carry glucose tablets (low sugar emergency)
+- Wear comfortable shoes
+- Stay hydrated
+- Exercise at same time daily
+- **Best time:** 30-60 min after meals"""
+
+LIFESTYLE_TIPS = """\
+---
+### 📋 **Additional Lifestyle Tips**
+
+<div style="background-color: #e3f2fd; padding: 15px; border-radius: 10px;">
+
+**✅ Do's:**
+- Monitor blood sugar regularly (before meals, 2 hours after meals)
+- Eat small, frequent meals (5-6 times/day)
+- Drink 8-10 glasses of water daily
+- Sleep 7-8 hours/night
+- Manage stress (meditation, yoga)
+- Check feet daily for cuts/sores
+- Regular health check-ups (every 3 months)
+- Take medications on time
+- Carry diabetic ID card
+
+**❌ Don'ts:**
+- Skip meals (causes blood sugar fluctuations)
+- Smoke (increases complications)
+- Drink alcohol (or limit strictly)
+- Sit for long periods (move every 30 min)
+- Ignore symptoms (thirst, frequent urination, fatigue)
+- Self-medicate
+- Delay doctor visits
+
+</div>"""
+
+DOCTOR_WARNING = """\
+---
+### 📞 **When to Contact Doctor IMMEDIATELY:**
+
+<div style="background-color: #fff3e0; padding: 15px; border-radius: 10px; border-left: 5px solid #ffa726;">
+
+**🚨 Emergency Signs:**
+- Blood sugar below 70 mg/dL (hypoglycemia)
+- Blood sugar above 300 mg/dL (hyperglycemia)
+- Severe dizziness or confusion
+- Excessive thirst/urination
+- Blurred vision
+- Chest pain
+- Difficulty breathing
+- Numbness in feet/hands
+- Non-healing wounds
+
+**Emergency Contacts:**
+- Keep doctor's number handy
+- Know nearest hospital location
+- Inform family about condition
+
+</div>"""
+
+HEALTHY_LIFESTYLE = """\
+---
+### ✅ **Maintain Your Healthy Lifestyle:**
+
+- Continue balanced diet with whole grains, vegetables, lean proteins
+- Exercise 150 minutes/week (30 min × 5 days)
+- Maintain healthy weight (BMI 18.5-24.9)
+- Regular health check-ups annually
+- Manage stress through yoga/meditation
+- Avoid smoking and limit alcohol
+- Sleep 7-8 hours/night"""
+
+# High-risk guidance in display order: a string is one markdown call,
+# a tuple is laid out as side-by-side columns
+HIGH_RISK_PLAN = [
+    '<div class="info-box">⚠️ High risk detected. Please consult a healthcare provider immediately.</div>',
+    "---\n### 🥗 **Recommended Diet Plan for Diabetes Management**\n\n#### ✅ **Foods to EAT:**",
+    (EAT_PLANTS_AND_GRAINS, EAT_PROTEINS_AND_DRINKS),
+    FOODS_TO_AVOID,
+    "---\n### 🍽️ **Sample Daily Meal Plan**",
+    (BREAKFAST, LUNCH_AND_SNACK, DINNER),
+    EXERCISE_GOAL,
+    (EXERCISE_TYPES, EXERCISE_SCHEDULE),
+    LIFESTYLE_TIPS,
+    DOCTOR_WARNING,
+]
+
+GENERAL_TIPS = (
+    '<div class="info-box">✅ Exercise: Aim for at least 150 minutes of moderate aerobic activity per week.</div>\n'
+    '<div class="info-box">✅ Diet: Follow a balanced diet rich in vegetables, whole grains, and lean proteins.</div>'
+)
+
+
+def build_fragments(t):
+    """Ready-to-render fragments for one language's TRANSLATIONS entry"""
+    return {
+        'results_header': f"---\n## {t['prediction_results']}",
+        'recommendations_header': f"### {t['recommendations']}",
+        'high_risk_plan': HIGH_RISK_PLAN,
+        'healthy_lifestyle': HEALTHY_LIFESTYLE,
+        'general_tips': GENERAL_TIPS,
+        'footer': f"---\n<p style='text-align: center; color: gray;'>{t['disclaimer']}</p>",
+    }
@@ -0,0 +1,121 @@
+"""
+Prediction Cache
+LRU + TTL cache of (prediction, probability) for repeated inputs
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from inference import MANIFEST_FILE, MODEL_FILE
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 3600
+
+
+def canonical_key(row, model_version):
+    """Hashable key for a feature row in FEATURE_COLUMNS order
+
+    Values are normalized to float64 so 120, 120.0 and np.int64(120) share
+    an entry; the model version keeps results of different models apart.
+    """
+    values = np.asarray(row, dtype=np.float64).ravel() + 0.0  # folds -0.0 into 0.0
+    return model_version, values.tobytes()
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry expiry
+
+    Entries are keyed on the canonical input row plus the model version
+    (the artifact hash in model_info). The whole cache is dropped whenever
+    one of watch_paths changes on disk, so a retrained model never serves
+    results computed by the previous one.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 watch_paths=(MODEL_FILE, MANIFEST_FILE)):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.watch_paths = watch_paths
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._signatures = self._read_signatures()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def _read_signatures(self):
+        return [_file_signature(path) for path in self.watch_paths]
+
+    def _check_files(self):
+        signatures = self._read_signatures()
+        if signatures != self._signatures:
+            self._signatures = signatures
+            self._entries.clear()
+            self._invalidations += 1
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        with self._lock:
+            self._check_files()
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if time.monotonic() < expires:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def predict(self, row, model_version, predict_fn):
+        """(prediction, probability) for row, calling predict_fn(row) only on a miss"""
+        key = canonical_key(row, model_version)
+        result = self.get(key)
+        if result is None:
+            result = predict_fn(row)
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        """Hit-rate and size metrics since start"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+            }
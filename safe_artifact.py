@@ -0,0 +1,461 @@
+"""
+Safe Model Artifacts
+Schema'd, pickle-free model files: a JSON header plus memory-mapped .npy arrays
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+from scipy.special import expit
+
+from inference import FEATURE_COLUMNS, ArtifactError
+from tree_compiler import CompiledTrees, compile_model
+
+SAFE_ARTIFACT_PREFIX = 'diabetes_arrays_'
+HEADER_FILE = 'header.json'
+FORMAT_NAME = 'diabetes-model-arrays'
+FORMAT_VERSION = 2
+
+# Only plain numbers are stored: bool, int, uint and float
+ARRAY_KINDS = 'biuf'
+
+# Largest |difference| from the original estimator accepted when writing
+MAX_ABS_DIFF = 1e-9
+
+# Rows per kernel block when scoring an SVM (bounds the rows x support vectors matrix)
+SVM_BLOCK_ROWS = 2048
+
+
+def _binary_proba(positive):
+    return np.column_stack([1.0 - positive, positive])
+
+
+class ArrayScaler:
+    """StandardScaler.transform from its mean_ and scale_ arrays"""
+
+    ARRAYS = ('mean_', 'scale_')
+
+    def __init__(self, mean_, scale_):
+        self.mean_ = mean_
+        self.scale_ = scale_
+
+    def transform(self, X):
+        # Same operations, in the same order, as StandardScaler
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class LinearModel:
+    """Binary logistic model: expit(X . coef + intercept)
+
+    coef_ and intercept_ have sklearn's shapes, so FastPredictor takes its
+    dot-product path for these as it does for LogisticRegression.
+    """
+
+    family = 'linear'
+    ARRAYS = ('coef_', 'intercept_')
+    classes_ = np.array([0, 1])
+
+    def __init__(self, coef_, intercept_):
+        self.coef_ = coef_
+        self.intercept_ = intercept_
+        self.n_features_in_ = coef_.shape[1]
+
+    def decision_function(self, X):
+        return (np.asarray(X, dtype=np.float64) @ self.coef_.T + self.intercept_).ravel()
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0).astype(int)
+
+    def predict_proba(self, X):
+        return _binary_proba(expit(self.decision_function(X)))
+
+    def arrays(self):
+        return {'coef_': self.coef_, 'intercept_': self.intercept_}
+
+    def params(self):
+        return {}
+
+    @classmethod
+    def from_arrays(cls, arrays, params):
+        return cls(arrays['coef_'], arrays['intercept_'])
+
+
+class TreeModel:
+    """Decision tree, random forest or gradient boosting as CompiledTrees walk tables
+
+    The stored arrays are exactly the ones the walk reads, so a loaded model
+    scores straight from the memory-mapped files.
+    """
+
+    family = 'trees'
+    ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+    classes_ = np.array([0, 1])
+
+    def __init__(self, compiled, n_features_in_):
+        self.compiled = compiled
+        self.n_features_in_ = n_features_in_
+
+    def predict(self, X):
+        # argmax of (1 - p, p), ties going to class 0, as sklearn does
+        return (self.compiled.predict_proba(X) > 0.5).astype(int)
+
+    def predict_proba(self, X):
+        return _binary_proba(self.compiled.predict_proba(X))
+
+    def arrays(self):
+        return self.compiled.tables()
+
+    def params(self):
+        compiled = self.compiled
+        return {'kind': compiled.kind, 'max_depth': compiled.max_depth, 'learning_rate': compiled.learning_rate,
+                'init_raw': compiled.init_raw, 'n_features_in': self.n_features_in_}
+
+    @classmethod
+    def from_arrays(cls, arrays, params):
+        tables = [arrays[name] for name in cls.ARRAYS]
+        if tables[0].dtype != np.intp or tables[2].dtype != np.intp or tables[4].dtype != np.intp:
+            raise ArtifactError("Tree node indices were written on a platform with another pointer size")
+        compiled = CompiledTrees.from_tables(params['kind'], *tables, params['max_depth'],
+                                             params['learning_rate'], params['init_raw'])
+        return cls(compiled, params['n_features_in'])
+
+
+class SVMModel:
+    """Binary RBF SVC with Platt-scaled probabilities, as libsvm computes them
+
+    decision = sum_i dual_coef_i * exp(-gamma |x - sv_i|^2) + intercept,
+    mapped through the Platt sigmoid (prob_a, prob_b) and libsvm's pairwise
+    coupling iteration, which for two classes stops once within 0.0025 of
+    the sigmoid; reproducing it keeps results equal to SVC.predict_proba.
+    """
+
+    family = 'svm'
+    ARRAYS = ('support_vectors_', 'dual_coef_')
+    classes_ = np.array([0, 1])
+
+    def __init__(self, support_vectors_, dual_coef_, intercept, gamma, prob_a, prob_b):
+        self.support_vectors_ = support_vectors_
+        self.dual_coef_ = dual_coef_
+        self.intercept = float(intercept)
+        self.gamma = float(gamma)
+        self.prob_a = float(prob_a)
+        self.prob_b = float(prob_b)
+        self.n_features_in_ = support_vectors_.shape[1]
+        self._sv_norms = np.einsum('ij,ij->i', support_vectors_, support_vectors_)
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        scores = np.empty(len(X))
+        for start in range(0, len(X), SVM_BLOCK_ROWS):
+            block = X[start:start + SVM_BLOCK_ROWS]
+            distances = np.einsum('ij,ij->i', block, block)[:, None] + self._sv_norms - 2.0 * block @ self.support_vectors_.T
+            np.maximum(distances, 0.0, out=distances)
+            scores[start:start + SVM_BLOCK_ROWS] = np.exp(-self.gamma * distances) @ self.dual_coef_ + self.intercept
+        return scores
+
+    def predict(self, X):
+        # SVC.predict uses the sign of the decision function, not the probabilities
+        return (self.decision_function(X) > 0).astype(int)
+
+    def predict_proba(self, X):
+        # libsvm's decision value has the opposite sign to sklearn's
+        f = -self.decision_function(X) * self.prob_a + self.prob_b
+        with np.errstate(over='ignore'):
+            r = np.where(f >= 0, np.exp(-f) / (1.0 + np.exp(-f)), 1.0 / (1.0 + np.exp(f)))
+        r = np.clip(r, 1e-7, 1 - 1e-7)
+        return _couple(r).T
+
+    def arrays(self):
+        return {'support_vectors_': self.support_vectors_, 'dual_coef_': self.dual_coef_}
+
+    def params(self):
+        return {'intercept': self.intercept, 'gamma': self.gamma, 'prob_a': self.prob_a, 'prob_b': self.prob_b}
+
+    @classmethod
+    def from_arrays(cls, arrays, params):
+        return cls(arrays['support_vectors_'], arrays['dual_coef_'], params['intercept'], params['gamma'],
+                   params['prob_a'], params['prob_b'])
+
+
+def _couple(r01, max_iter=100, eps=0.0025):
+    """libsvm's multiclass_probability for two classes, vectorized over rows"""
+    r10 = 1.0 - r01
+    Q = np.array([[r10 * r10, -r10 * r01], [-r01 * r10, r01 * r01]])
+    p = np.full((2, len(r01)), 0.5)
+    active = np.ones(len(r01), dtype=bool)
+    for _ in range(max_iter):
+        Qp = np.einsum('tjn,jn->tn', Q, p)
+        pQp = (p * Qp).sum(axis=0)
+        active &= np.abs(Qp - pQp).max(axis=0) >= eps
+        if not active.any():
+            break
+        for t in range(2):
+            diff = np.where(active, (pQp - Qp[t]) / Q[t, t], 0.0)
+            p[t] += diff
+            pQp = (pQp + diff * (diff * Q[t, t] + 2 * Qp[t])) / (1 + diff) / (1 + diff)
+            Qp = (Qp + diff * Q[t]) / (1 + diff)
+            p /= 1 + diff
+    return p
+
+
+FAMILIES = {cls.family: cls for cls in (LinearModel, TreeModel, SVMModel)}
+
+
+def from_estimator(estimator):
+    """(model, scaler) array models for a fitted estimator, or None if unsupported
+
+    estimator is what fuse_scaler returns: a fused linear model, or a
+    Pipeline of StandardScaler and model.
+    """
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import SVC
+
+    scaler = None
+    if isinstance(estimator, Pipeline):
+        scaler, estimator = estimator.named_steps['scaler'], estimator.named_steps['model']
+        if scaler.mean_ is None or scaler.scale_ is None:
+            return None
+        scaler = ArrayScaler(np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64))
+    if list(getattr(estimator, 'classes_', ())) != [0, 1]:
+        return None
+
+    if isinstance(estimator, (LogisticRegression, SGDClassifier)):
+        if estimator.coef_.shape[0] != 1:
+            return None
+        return LinearModel(np.ascontiguousarray(estimator.coef_), np.ascontiguousarray(estimator.intercept_)), scaler
+
+    if isinstance(estimator, SVC):
+        if estimator.kernel != 'rbf' or not estimator.probability:
+            return None
+        model = SVMModel(np.ascontiguousarray(estimator.support_vectors_), np.ascontiguousarray(estimator.dual_coef_[0]),
+                         estimator.intercept_[0], estimator._gamma, estimator.probA_[0], estimator.probB_[0])
+        return model, scaler
+
+    compiled = compile_model(estimator)
+    if compiled is None:
+        return None
+    return TreeModel(compiled, estimator.n_features_in_), scaler
+
+
+def predict_positive(model, scaler, X):
+    """Positive-class probability of array models on raw features"""
+    if scaler is not None:
+        X = scaler.transform(X)
+    return model.predict_proba(X)[:, 1]
+
+
+def _named(estimator, X):
+    # Estimators fitted on a DataFrame warn when given a bare array
+    if not hasattr(estimator, 'feature_names_in_'):
+        return X
+    import pandas as pd
+
+    return pd.DataFrame(X, columns=estimator.feature_names_in_)
+
+
+def _file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def write_artifact(estimator, X_check, directory='.'):
+    """Write estimator as a safe artifact, verified against it on X_check (raw features)
+
+    Returns {'safe_artifact', 'safe_sha256', 'safe_family', 'safe_max_abs_diff'}
+    for the manifest, or None if the model family is unsupported or the
+    arrays do not reproduce its probabilities. The directory is named after
+    the header's hash, which covers every array's hash, and is renamed into
+    place complete.
+    """
+    converted = from_estimator(estimator)
+    if converted is None:
+        return None
+    model, scaler = converted
+    X_check = np.asarray(X_check, dtype=np.float64)
+    expected = estimator.predict_proba(_named(estimator, X_check))[:, 1]
+    mismatch = float(np.max(np.abs(predict_positive(model, scaler, X_check) - expected)))
+    if mismatch > MAX_ABS_DIFF:
+        return None
+
+    arrays = dict(model.arrays())
+    if scaler is not None:
+        arrays.update({f'scaler.{name}': getattr(scaler, name) for name in ArrayScaler.ARRAYS})
+
+    tmp_dir = os.path.join(directory, f".{SAFE_ARTIFACT_PREFIX}tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    specs = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        path = os.path.join(tmp_dir, f'{name}.npy')
+        np.save(path, array, allow_pickle=False)
+        specs[name] = {'file': f'{name}.npy', 'dtype': array.dtype.str, 'shape': list(array.shape),
+                       'sha256': _file_sha256(path)}
+
+    header = {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'family': model.family,
+        'feature_order': FEATURE_COLUMNS,
+        'params': model.params(),
+        'scaled': scaler is not None,
+        'arrays': specs,
+    }
+    payload = json.dumps(header, indent=2, sort_keys=True).encode('utf-8')
+    sha256 = hashlib.sha256(payload).hexdigest()
+    with open(os.path.join(tmp_dir, HEADER_FILE), 'wb') as f:
+        f.write(payload)
+
+    name = f"{SAFE_ARTIFACT_PREFIX}{sha256[:12]}"
+    target = os.path.join(directory, name)
+    if os.path.isdir(target):  # same content already written
+        shutil.rmtree(tmp_dir)
+    else:
+        os.replace(tmp_dir, target)
+    return {'safe_artifact': name, 'safe_sha256': sha256, 'safe_family': model.family,
+            'safe_max_abs_diff': mismatch}
+
+
+def _load_array(directory, name, spec, verify):
+    if spec.get('file') != f'{name}.npy':
+        raise ArtifactError(f"Array '{name}' points outside its artifact: {spec.get('file')!r}")
+    path = os.path.join(directory, spec['file'])
+    if verify and _file_sha256(path) != spec['sha256']:
+        raise ArtifactError(f"{path} does not match its header hash")
+    # A plain read-only ndarray over the mapping: no copy, no memmap overhead per operation
+    array = np.asarray(np.load(path, mmap_mode='r', allow_pickle=False))
+    if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape'] or array.dtype.kind not in ARRAY_KINDS:
+        raise ArtifactError(f"{path} is {array.dtype.str} {list(array.shape)}, "
+                            f"header says {spec['dtype']} {spec['shape']}")
+    return array
+
+
+def read_artifact(path, sha256=None, verify=True):
+    """Load (model, scaler) from a safe artifact directory
+
+    Only JSON and .npy files are parsed (np.load with allow_pickle=False),
+    so nothing in the artifact can run code. Arrays are memory-mapped
+    read-only, not copied. With verify, the header must hash to sha256
+    (when given) and every array file to its hash in the header; scaler
+    is None when the model takes raw features.
+    """
+    with open(os.path.join(path, HEADER_FILE), 'rb') as f:
+        payload = f.read()
+    if sha256 is not None and hashlib.sha256(payload).hexdigest() != sha256:
+        raise ArtifactError(f"{path} does not match its manifest hash")
+    header = json.loads(payload)
+    if header.get('format') != FORMAT_NAME or header.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(f"{path} is not a version {FORMAT_VERSION} {FORMAT_NAME} artifact "
+                            f"(upgrade it with 'python safe_artifact.py --convert')")
+    if header['feature_order'] != FEATURE_COLUMNS:
+        raise ArtifactError(f"Unexpected feature order in {path}: {header['feature_order']}")
+    family = FAMILIES.get(header['family'])
+    if family is None:
+        raise ArtifactError(f"Unknown model family '{header['family']}' in {path}")
+
+    expected = set(family.ARRAYS)
+    if header['scaled']:
+        expected |= {f'scaler.{name}' for name in ArrayScaler.ARRAYS}
+    if set(header['arrays']) != expected:
+        raise ArtifactError(f"{path} has arrays {sorted(header['arrays'])}, expected {sorted(expected)}")
+    arrays = {name: _load_array(path, name, spec, verify) for name, spec in header['arrays'].items()}
+
+    model = family.from_arrays(arrays, header['params'])
+    scaler = ArrayScaler(*(arrays[f'scaler.{name}'] for name in ArrayScaler.ARRAYS)) if header['scaled'] else None
+    return model, scaler
+
+
+def _format_version(path):
+    """Format version in an artifact's header, or None when there is none"""
+    try:
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            return json.load(f).get('format_version')
+    except (TypeError, OSError, ValueError):
+        return None
+
+
+def remove_stale(directory, keep):
+    """Delete safe artifact directories whose names are not in keep"""
+    for name in os.listdir(directory):
+        if name.startswith(SAFE_ARTIFACT_PREFIX) and name not in keep:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def _best_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    """Convert the current model to a safe artifact and compare loading with pickle"""
+    from inference import MANIFEST_FILE, dummy_rows, load_manifest
+    from model_export import save_pipeline
+    from storage import atomic_write_json
+
+    parser = argparse.ArgumentParser(description="Write and benchmark the pickle-free model artifact")
+    parser.add_argument('--convert', action='store_true', help="Add (or upgrade) the safe artifact for the current model")
+    parser.add_argument('--repeats', type=int, default=20, help="Loads per timing")
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    if args.convert:
+        if manifest is None:
+            # Older training runs: write the fused artifact, which adds the safe one
+            from inference import load_artifacts
+            model, scaler, model_info = load_artifacts()
+            if model is None:
+                print("Model not found! Please run 'train_model.py' first.")
+                return
+            model_info = {k: v for k, v in model_info.items() if k != 'artifact_sha256'}
+            manifest = save_pipeline(model, scaler, model_info)
+        elif _format_version(manifest.get('safe_artifact')) != FORMAT_VERSION:
+            with open(manifest['artifact'], 'rb') as f:
+                estimator = pickle.loads(f.read())
+            entry = write_artifact(estimator, dummy_rows(1000))
+            if entry is not None:
+                manifest.update(entry)
+                atomic_write_json(MANIFEST_FILE, manifest)
+                remove_stale('.', {os.path.basename(entry['safe_artifact'])})
+
+    if manifest is None:
+        print(f"No {MANIFEST_FILE}; run with --convert (or retrain) to write one.")
+        return
+    if not manifest.get('safe_artifact'):
+        print(f"{manifest['model_info']['model_name']} has no safe artifact: the model family is not supported "
+              f"or its arrays did not reproduce predict_proba. Loading falls back to pickle.")
+        return
+
+    with open(manifest['artifact'], 'rb') as f:
+        payload = f.read()
+    path = manifest['safe_artifact']
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"Model: {manifest['model_info']['model_name']} ({manifest['safe_family']}), "
+          f"pickle {len(payload) / 1024:.1f} KB, safe artifact {size / 1024:.1f} KB")
+
+    pickle_ms = _best_ms(lambda: pickle.loads(payload), args.repeats)
+    verified_ms = _best_ms(lambda: read_artifact(path, manifest['safe_sha256']), args.repeats)
+    mapped_ms = _best_ms(lambda: read_artifact(path, verify=False), args.repeats)
+    print(f"  pickle.loads                {pickle_ms:8.3f} ms")
+    print(f"  read_artifact (verified)    {verified_ms:8.3f} ms")
+    print(f"  read_artifact (no hashing)  {mapped_ms:8.3f} ms")
+
+    estimator = pickle.loads(payload)
+    model, scaler = read_artifact(path, manifest['safe_sha256'])
+    X = dummy_rows(10000, seed=1)
+    mismatch = np.max(np.abs(predict_positive(model, scaler, X) - estimator.predict_proba(_named(estimator, X))[:, 1]))
+    print(f"Max |safe - pickle| predict_proba on {len(X):,} rows: {mismatch:.3g}")
+
+
+if __name__ == "__main__":
+    main()
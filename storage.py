@@ -0,0 +1,197 @@
+"""
+Concurrency-Safe JSON Persistence
+File locking and atomic writes shared by the user and history stores
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# OS file locks do not reliably exclude threads of the same process,
+# so every lock file also gets an in-process lock
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(lock_path):
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(lock_path, threading.Lock())
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive writer lock for path across threads and processes"""
+    lock_path = os.path.abspath(path) + '.lock'
+    with _thread_lock(lock_path):
+        with open(lock_path, 'a+') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_umask():
+    """The process umask, read without changing it
+
+    os.umask can only be queried by setting it, which would briefly apply
+    to files other threads create, so Linux's /proc is read instead; other
+    systems create a scratch file and see which mode bits it lost.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'umask')
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o666))
+        return 0o666 & ~stat.S_IMODE(os.stat(path).st_mode)
+
+
+_UMASK = _read_umask()
+
+
+def _file_mode(path):
+    """Permissions for a rewrite of path: its current mode, or the umask default"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write_text(path, text):
+    """Write text to a temporary file and rename it over path
+
+    mkstemp creates the file owner-only, so it gets path's mode first;
+    otherwise other users (the app vs. the trainer) lose read access.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        os.chmod(tmp_path, _file_mode(path))
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path, data):
+    """Write JSON to a temporary file and rename it over path"""
+    atomic_write_text(path, json.dumps(data))
+
+
+def read_json(path, default=None):
+    """Read a JSON file without locking
+
+    Writers always publish with an atomic rename, so readers see either the
+    previous or the new version of the file, never a partial one.
+    """
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {} if default is None else default
+
+
+def update_json(path, update, default=None):
+    """Read-modify-write a JSON file under the writer lock
+
+    update(data) mutates data in place; its return value is passed back to
+    the caller. Return False from update to skip writing.
+    """
+    with file_lock(path):
+        data = read_json(path, default)
+        result = update(data)
+        if result is not False:
+            atomic_write_json(path, data)
+        return result
+
+
+def stress_test(directory, writers=300, records_per_writer=3):
+    """Hammer the JSON and history stores with concurrent writer threads
+
+    Returns a dict of store name -> number of lost records.
+    """
+    from history_store import JSONHistoryStore, SQLiteHistoryStore
+
+    users_path = os.path.join(directory, 'users.json')
+    stores = {
+        'users.json': None,
+        'history (json)': JSONHistoryStore(os.path.join(directory, 'history.json')),
+        'history (sqlite)': SQLiteHistoryStore(os.path.join(directory, 'history.db')),
+    }
+
+    def add_user(data, key):
+        data[key] = {'created': time.time()}
+
+    def writer(worker_id):
+        for i in range(records_per_writer):
+            key = f"user{worker_id}-{i}"
+            update_json(users_path, lambda data: add_user(data, key))
+            record = {'date': str(time.time()), 'data': {'probability': 0.5}}
+            stores['history (json)'].append(key, record)
+            stores['history (sqlite)'].append(key, record)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = writers * records_per_writer
+    return {
+        'users.json': expected - len(read_json(users_path)),
+        'history (json)': expected - stores['history (json)'].count(),
+        'history (sqlite)': expected - stores['history (sqlite)'].count(),
+    }
+
+
+def main():
+    """Run the concurrent-writer stress test"""
+    parser = argparse.ArgumentParser(description="Stress test concurrent storage writers")
+    parser.add_argument('--writers', type=int, default=300, help="Number of writer threads")
+    parser.add_argument('--records', type=int, default=3, help="Records written per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        lost = stress_test(directory, args.writers, args.records)
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.writers} writers x {args.records} records in {elapsed:.2f}s")
+    for name, count in lost.items():
+        print(f"  {name:18s} lost records: {count}")
+
+    if any(lost.values()):
+        raise SystemExit(1)
+    print("No records lost.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Streaming Model Training
+Out-of-core training for screening datasets larger than memory
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.naive_bayes import GaussianNB
+from sklearn.preprocessing import StandardScaler
+
+from batch_score import read_chunks
+from dataset_manager import COLUMNS
+from inference import FEATURE_COLUMNS, ZERO_COLUMNS, clean_features, predict
+from model_export import save_legacy_pickles, save_pipeline
+
+DEFAULT_CHUNKSIZE = 100000
+
+# Values kept per feature to estimate its median
+MEDIAN_SAMPLE_SIZE = 100000
+
+# Every HOLDOUT_EVERY-th row is held out for evaluation
+HOLDOUT_EVERY = 5
+
+
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE, header=True):
+    """Yield DataFrame chunks with the feature and Outcome columns"""
+    if path.endswith('.npy'):
+        array = np.load(path, mmap_mode='r')
+        for start in range(0, len(array), chunksize):
+            yield pd.DataFrame(np.asarray(array[start:start + chunksize]), columns=COLUMNS)
+    elif header:
+        yield from read_chunks(path, chunksize)
+    else:
+        yield from pd.read_csv(path, names=COLUMNS, chunksize=chunksize)
+
+
+class StreamingStats:
+    """One-pass per-feature statistics for imputation and scaling
+
+    Missing values (NaN, and zeros in ZERO_COLUMNS) are counted but not
+    summed. Medians are estimated from a bounded uniform sample of the
+    observed values (smallest random keys win, so the sample is uniform
+    however the data is chunked).
+    """
+
+    def __init__(self, sample_size=MEDIAN_SAMPLE_SIZE, random_state=42):
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(random_state)
+        self.n_rows = 0
+        self.n_missing = {column: 0 for column in FEATURE_COLUMNS}
+        self.sums = {column: 0.0 for column in FEATURE_COLUMNS}
+        self.sq_sums = {column: 0.0 for column in FEATURE_COLUMNS}
+        self.samples = {column: (np.empty(0), np.empty(0)) for column in FEATURE_COLUMNS}
+
+    def update(self, df):
+        self.n_rows += len(df)
+        for column in FEATURE_COLUMNS:
+            values = df[column].to_numpy(dtype=float)
+            missing = np.isnan(values)
+            if column in ZERO_COLUMNS:
+                missing |= values == 0
+            observed = values[~missing]
+
+            self.n_missing[column] += int(missing.sum())
+            self.sums[column] += float(observed.sum())
+            self.sq_sums[column] += float(np.square(observed).sum())
+
+            keys, kept = self.samples[column]
+            keys = np.concatenate([keys, self.rng.random(len(observed))])
+            kept = np.concatenate([kept, observed])
+            if len(keys) > self.sample_size:
+                keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+                keys, kept = keys[keep], kept[keep]
+            self.samples[column] = (keys, kept)
+
+    def medians(self):
+        """Approximate median of each feature's observed values"""
+        return {column: float(np.median(self.samples[column][1])) for column in FEATURE_COLUMNS}
+
+    def scaler(self):
+        """StandardScaler fitted to the data after median imputation
+
+        Imputed rows all take the median m, so their contribution to the
+        sums is known exactly once m is: n_missing * m and n_missing * m^2.
+        """
+        medians = self.medians()
+        n = self.n_rows
+        mean = np.empty(len(FEATURE_COLUMNS))
+        var = np.empty(len(FEATURE_COLUMNS))
+        for i, column in enumerate(FEATURE_COLUMNS):
+            m = medians[column]
+            total = self.sums[column] + self.n_missing[column] * m
+            sq_total = self.sq_sums[column] + self.n_missing[column] * m * m
+            mean[i] = total / n
+            var[i] = max(sq_total / n - mean[i] ** 2, 0.0)
+
+        scaler = StandardScaler()
+        scaler.mean_ = mean
+        scaler.var_ = var
+        scaler.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+        scaler.n_samples_seen_ = n
+        scaler.n_features_in_ = len(FEATURE_COLUMNS)
+        scaler.feature_names_in_ = np.array(FEATURE_COLUMNS, dtype=object)
+        return scaler
+
+
+def _split(chunk, offset):
+    """Deterministic train/holdout split by global row number"""
+    holdout = (np.arange(offset, offset + len(chunk)) % HOLDOUT_EVERY) == 0
+    return chunk[~holdout], chunk[holdout]
+
+
+def train_streaming(path, chunksize=DEFAULT_CHUNKSIZE, epochs=1, header=True):
+    """Train incremental models over a file without loading it whole
+
+    Pass 1 gathers imputation and scaling statistics; each following epoch
+    streams the data once more through partial_fit. Returns
+    (results, scaler, feature_medians) in the shape used by save_best_model.
+    """
+    print("Pass 1: computing medians and scaler statistics...")
+    stats = StreamingStats()
+    for chunk in iter_chunks(path, chunksize, header):
+        stats.update(chunk)
+    feature_medians = stats.medians()
+    scaler = stats.scaler()
+    print(f"   {stats.n_rows} rows")
+
+    models = {
+        'SGD Logistic Regression': SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42),
+        'Gaussian Naive Bayes': GaussianNB(),
+    }
+    classes = np.array([0, 1])
+
+    for epoch in range(epochs):
+        print(f"Pass {epoch + 2}: partial_fit epoch {epoch + 1}/{epochs}...")
+        offset = 0
+        for chunk in iter_chunks(path, chunksize, header):
+            train, _ = _split(chunk, offset)
+            offset += len(chunk)
+            if len(train) == 0:
+                continue
+            X = scaler.transform(clean_features(train, feature_medians))
+            y = train['Outcome'].to_numpy(dtype=int)
+            for model in models.values():
+                model.partial_fit(X, y, classes=classes)
+
+    print("Evaluating on holdout rows...")
+    y_true = []
+    y_pred = {name: [] for name in models}
+    offset = 0
+    for chunk in iter_chunks(path, chunksize, header):
+        _, holdout = _split(chunk, offset)
+        offset += len(chunk)
+        if len(holdout) == 0:
+            continue
+        X = clean_features(holdout, feature_medians)
+        y_true.append(holdout['Outcome'].to_numpy(dtype=int))
+        for name, model in models.items():
+            y_pred[name].append(predict(model, scaler, X)[0])
+
+    y_true = np.concatenate(y_true)
+    results = {}
+    for name, model in models.items():
+        predictions = np.concatenate(y_pred[name])
+        results[name] = {
+            'model': model,
+            'accuracy': accuracy_score(y_true, predictions),
+            'precision': precision_score(y_true, predictions, zero_division=0),
+            'recall': recall_score(y_true, predictions, zero_division=0),
+            'f1_score': f1_score(y_true, predictions, zero_division=0),
+            'cv_score': None,
+        }
+        print(f"   {name}: accuracy {results[name]['accuracy']:.4f}, F1 {results[name]['f1_score']:.4f}")
+
+    return results, scaler, feature_medians
+
+
+def save_streaming_model(results, scaler, feature_medians, legacy_pickles=False):
+    """Save the best streaming model in the same artifact layout as train_model.py"""
+    best_model_name = max(results, key=lambda name: results[name]['f1_score'])
+    best_model = results[best_model_name]['model']
+
+    model_info = {
+        'model_name': best_model_name,
+        'accuracy': results[best_model_name]['accuracy'],
+        'precision': results[best_model_name]['precision'],
+        'recall': results[best_model_name]['recall'],
+        'f1_score': results[best_model_name]['f1_score'],
+        'cv_score': None,
+        'feature_medians': feature_medians,
+        'decision_threshold': 0.5,
+        'training_mode': 'streaming',
+    }
+
+    if legacy_pickles:
+        save_legacy_pickles(best_model, scaler, model_info)
+    manifest = save_pipeline(best_model, scaler, model_info)
+
+    print(f"\nBest Model: {best_model_name} (F1 {model_info['f1_score']:.4f})")
+    print(f"Fused artifact saved: {manifest['artifact']}")
+    if manifest['safe_artifact']:
+        print(f"Safe artifact saved: {manifest['safe_artifact']}")
+    return best_model_name, best_model
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Train on a dataset too large for memory")
+    parser.add_argument('input', help="CSV, Parquet or .npy file with the 8 features and Outcome")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk")
+    parser.add_argument('--epochs', type=int, default=1, help="Passes of partial_fit over the data")
+    parser.add_argument('--legacy-pickles', action='store_true',
+                        help="Also write diabetes_model.pkl, scaler.pkl and model_info.pkl for older tools")
+    parser.add_argument('--no-header', action='store_true', help="CSV has no header row (raw Pima layout)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file not found: {args.input}")
+        return
+
+    results, scaler, feature_medians = train_streaming(
+        args.input, args.chunksize, args.epochs, header=not args.no_header
+    )
+    save_streaming_model(results, scaler, feature_medians, args.legacy_pickles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Storage Tests
+Concurrent writers and file modes of the JSON persistence helpers
+"""
+
+import os
+import stat
+
+import storage
+
+
+def test_concurrent_writers_lose_no_records(tmp_path):
+    lost = storage.stress_test(str(tmp_path), writers=50, records_per_writer=3)
+    assert lost == {'users.json': 0, 'history (json)': 0, 'history (sqlite)': 0}
+
+
+def test_umask_is_read_without_changing_it():
+    current = os.umask(0o022)
+    os.umask(current)
+    assert storage._read_umask() == current
+
+
+def test_new_file_gets_umask_default(tmp_path):
+    path = tmp_path / 'data.json'
+    storage.atomic_write_json(str(path), {'a': 1})
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~storage._UMASK
+    assert storage.read_json(str(path)) == {'a': 1}
+
+
+def test_rewrite_keeps_file_mode(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text('{}')
+    path.chmod(0o640)
+    storage.update_json(str(path), lambda data: data.update(a=1))
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+    assert storage.read_json(str(path)) == {'a': 1}
@@ -3,30 +3,29 @@ Diabetes Prediction Model Training
 This script trains multiple ML models and saves the best one
 """
 
-import pandas as pd
+import argparse
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.svm import SVC
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, classification_report
-import pickle
+from dataset_manager import load_dataset
+from model_export import save_legacy_pickles, save_pipeline
+from training_engine import RESULT_METRICS, train_models_parallel
+from hyperparam_search import tune_models
+from model_benchmark import benchmark_models, select_model
+from tree_compiler import check_compiled
 import warnings
 warnings.filterwarnings('ignore')
 
 def load_data():
     """Load the Pima Indians Diabetes Dataset"""
-    # Dataset URL
-    url = "https://raw.githubusercontent.com/jbrownlee/Datasets/master/pima-indians-diabetes.data.csv"
+    # Local cache first, then download, then the bundled sample data
+    df, source = load_dataset()
+    print(f"   Loaded dataset from {source}")
     
-    # Column names
-    columns = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 
-               'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age', 'Outcome']
-    
-    # Load data
-    df = pd.read_csv(url, names=columns)
     return df
 
 def preprocess_data(df):
@@ -36,15 +35,19 @@ def preprocess_data(df):
     df[zero_columns] = df[zero_columns].replace(0, np.nan)
     
     # Fill missing values with median
-    df.fillna(df.median(), inplace=True)
+    medians = df.median()
+    df.fillna(medians, inplace=True)
     
     # Separate features and target
     X = df.drop('Outcome', axis=1)
     y = df['Outcome']
     
-    return X, y
+    # Keep the fill values so scoring can clean new data the same way
+    feature_medians = {column: float(medians[column]) for column in X.columns}
+    
+    return X, y, feature_medians
 
-def train_models(X_train, X_test, y_train, y_test):
+def train_models(X_train, X_test, y_train, y_test, n_jobs=-1, search=False, search_metric='f1', refit=False):
     """Train multiple models and compare performance"""
     
     models = {
@@ -52,65 +55,58 @@ def train_models(X_train, X_test, y_train, y_test):
         'Decision Tree': DecisionTreeClassifier(random_state=42),
         'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
         'Gradient Boosting': GradientBoostingClassifier(random_state=42),
-        'SVM': SVC(kernel='rbf', random_state=42)
+        'SVM': SVC(kernel='rbf', random_state=42, probability=True)
     }
     
-    results = {}
+    # Optionally replace the defaults with tuned hyperparameters
+    if search:
+        print("Searching hyperparameters (successive halving)...\n")
+        models = tune_models(models, X_train, y_train, metric=search_metric, n_jobs=n_jobs)
+        print()
     
     print("Training and evaluating models...\n")
     print("=" * 80)
     
-    for name, model in models.items():
-        # Train model
-        model.fit(X_train, y_train)
-        
-        # Predictions
-        y_pred = model.predict(X_test)
-        
-        # Metrics
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred)
-        recall = recall_score(y_test, y_pred)
-        f1 = f1_score(y_test, y_pred)
-        
-        # Cross-validation score
-        cv_scores = cross_val_score(model, X_train, y_train, cv=5)
-        cv_mean = cv_scores.mean()
-        
-        results[name] = {
-            'model': model,
-            'accuracy': accuracy,
-            'precision': precision,
-            'recall': recall,
-            'f1_score': f1,
-            'cv_score': cv_mean
-        }
-        
+    # Fit all models and CV folds in parallel
+    results, wall_time = train_models_parallel(
+        models, X_train, X_test, y_train, y_test, cv=5, n_jobs=n_jobs, refit=refit
+    )
+    
+    for name, result in results.items():
         print(f"{name}:")
-        print(f"  Accuracy:  {accuracy:.4f}")
-        print(f"  Precision: {precision:.4f}")
-        print(f"  Recall:    {recall:.4f}")
-        print(f"  F1-Score:  {f1:.4f}")
-        print(f"  CV Score:  {cv_mean:.4f}")
+        print(f"  Accuracy:  {result['accuracy']:.4f}")
+        print(f"  Precision: {result['precision']:.4f}")
+        print(f"  Recall:    {result['recall']:.4f}")
+        print(f"  F1-Score:  {result['f1_score']:.4f}")
+        print(f"  ROC AUC:   {result['roc_auc']:.4f}")
+        print(f"  CV Score:  {result['cv_score']:.4f}")
+        print(f"  Time:      {result['wall_time']:.2f}s wall-clock")
         print("-" * 80)
     
+    print(f"Total training time: {wall_time:.2f}s")
+    
     return results
 
-def save_best_model(results, scaler):
-    """Save the best performing model"""
-    # Find best model based on F1-score
-    best_model_name = max(results, key=lambda x: results[x]['f1_score'])
+def save_best_model(results, scaler, feature_medians, X_sample, latency_budget_ms=None, f1_tolerance=0.0,
+                    metric='f1_score', legacy_pickles=False):
+    """Save the best performing model by metric (a key of each result)"""
+    # Measure serving latency, size and load time of every candidate
+    print("\nBenchmarking inference latency...")
+    benchmarks = benchmark_models(results, X_sample)
+    for name, bench in benchmarks.items():
+        print(f"  {name:20s} {metric} {results[name][metric]:.4f} | "
+              f"p99 {bench['single_row_p99_ms']:.3f} ms/row | "
+              f"{bench['rows_per_second']:,.0f} rows/s batched | "
+              f"{bench['model_size_kb']:.1f} KB")
+    
+    # Find best model by the selection metric within the latency budget
+    best_model_name = select_model(results, benchmarks, metric=metric,
+                                   max_p99_ms=latency_budget_ms, tolerance=f1_tolerance)
     best_model = results[best_model_name]['model']
     
     print(f"\nBest Model: {best_model_name}")
-    print(f"F1-Score: {results[best_model_name]['f1_score']:.4f}")
-    
-    # Save model and scaler
-    with open('diabetes_model.pkl', 'wb') as f:
-        pickle.dump(best_model, f)
-    
-    with open('scaler.pkl', 'wb') as f:
-        pickle.dump(scaler, f)
+    print(f"{metric}: {results[best_model_name][metric]:.4f}")
+    print(f"Single-row p99 latency: {benchmarks[best_model_name]['single_row_p99_ms']:.3f} ms")
     
     # Save model info
     model_info = {
@@ -119,11 +115,36 @@ def save_best_model(results, scaler):
         'precision': results[best_model_name]['precision'],
         'recall': results[best_model_name]['recall'],
         'f1_score': results[best_model_name]['f1_score'],
-        'cv_score': results[best_model_name]['cv_score']
+        'roc_auc': results[best_model_name]['roc_auc'],
+        'cv_score': results[best_model_name]['cv_score'],
+        'feature_medians': feature_medians,
+        'decision_threshold': 0.5,
+        'latency': benchmarks[best_model_name],
+        'selection_policy': {'metric': metric, 'max_p99_ms': latency_budget_ms, 'tolerance': f1_tolerance},
+        'candidates': {
+            name: {'f1_score': results[name]['f1_score'], metric: results[name][metric], **benchmarks[name]}
+            for name in results
+        }
     }
     
-    with open('model_info.pkl', 'wb') as f:
-        pickle.dump(model_info, f)
+    # Check tree models' flat arrays against predict_proba on the test split
+    compiled_info = check_compiled(best_model, X_sample)
+    if compiled_info is not None:
+        model_info['compiled_trees'] = compiled_info
+        print(f"Compiled trees checked: {compiled_info['n_trees']} trees "
+              f"(max |diff| vs predict_proba: {compiled_info['max_abs_diff']:.3g})")
+    
+    # Separate pickles only for external tools that still read them
+    if legacy_pickles:
+        save_legacy_pickles(best_model, scaler, model_info)
+        print("Legacy pickles saved: diabetes_model.pkl, scaler.pkl, model_info.pkl")
+    
+    # Save fused scaler+model artifact with its manifest
+    manifest = save_pipeline(best_model, scaler, model_info)
+    print(f"Fused artifact saved: {manifest['artifact']} (sha256 {manifest['sha256'][:12]})")
+    if manifest['safe_artifact']:
+        print(f"Safe artifact saved: {manifest['safe_artifact']} "
+              f"(max |diff| vs predict_proba: {manifest['safe_max_abs_diff']:.3g})")
     
     print("\nModel, scaler, and info saved successfully!")
     
@@ -131,6 +152,18 @@ def save_best_model(results, scaler):
 
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Train diabetes prediction models")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Worker processes for training (-1 = all cores)")
+    parser.add_argument('--search', action='store_true', help="Tune hyperparameters before training")
+    parser.add_argument('--search-metric', default='f1', choices=sorted(RESULT_METRICS),
+                        help="Metric the search optimizes and the final model is selected by")
+    parser.add_argument('--refit', action='store_true', help="Refit each model on the full training split instead of keeping its best CV fold")
+    parser.add_argument('--legacy-pickles', action='store_true',
+                        help="Also write diabetes_model.pkl, scaler.pkl and model_info.pkl for older tools")
+    parser.add_argument('--latency-budget-ms', type=float, default=None, help="Max single-row p99 latency of the selected model")
+    parser.add_argument('--f1-tolerance', type=float, default=0.0, help="Metric difference treated as a tie (fastest tied model wins)")
+    args = parser.parse_args()
+    
     print("=" * 80)
     print("DIABETES PREDICTION MODEL TRAINING")
     print("=" * 80)
@@ -143,7 +176,7 @@ def main():
     
     # Preprocess data
     print("\n2. Preprocessing data...")
-    X, y = preprocess_data(df)
+    X, y, feature_medians = preprocess_data(df)
     
     # Split data
     print("\n3. Splitting data (80% train, 20% test)...")
@@ -159,11 +192,14 @@ def main():
     
     # Train models
     print("\n5. Training models...")
-    results = train_models(X_train_scaled, X_test_scaled, y_train, y_test)
+    results = train_models(X_train_scaled, X_test_scaled, y_train, y_test, n_jobs=args.n_jobs,
+                           search=args.search, search_metric=args.search_metric, refit=args.refit)
     
     # Save best model
     print("\n6. Saving best model...")
-    save_best_model(results, scaler)
+    save_best_model(results, scaler, feature_medians, X_test_scaled,
+                    latency_budget_ms=args.latency_budget_ms, f1_tolerance=args.f1_tolerance,
+                    metric=RESULT_METRICS[args.search_metric], legacy_pickles=args.legacy_pickles)
     
     print("\n" + "=" * 80)
     print("TRAINING COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,108 @@
+"""
+Parallel Training Engine
+Fit every model and every cross-validation fold across a process pool
+"""
+
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+# Search scorer name -> the test-split metric in each result, for selecting the final model
+RESULT_METRICS = {
+    'accuracy': 'accuracy',
+    'precision': 'precision',
+    'recall': 'recall',
+    'f1': 'f1_score',
+    'roc_auc': 'roc_auc',
+}
+
+
+def _evaluate(model, X_test, y_test, zero_division):
+    """Test-split metrics of a fitted model"""
+    y_pred = model.predict(X_test)
+    if hasattr(model, 'predict_proba'):
+        y_score = model.predict_proba(X_test)[:, 1]
+    else:
+        y_score = model.decision_function(X_test)
+    return {
+        'model': model,
+        'accuracy': accuracy_score(y_test, y_pred),
+        'precision': precision_score(y_test, y_pred, zero_division=zero_division),
+        'recall': recall_score(y_test, y_pred, zero_division=zero_division),
+        'f1_score': f1_score(y_test, y_pred, zero_division=zero_division),
+        'roc_auc': roc_auc_score(y_test, y_score),
+    }
+
+
+def _fit_full(name, model, X_train, X_test, y_train, y_test, zero_division):
+    """Fit on the whole training split and score on the test split"""
+    started = time.time()
+    model = clone(model).fit(X_train, y_train)
+    output = _evaluate(model, X_test, y_test, zero_division)
+    return name, 'full', output, (started, time.time())
+
+
+def _fit_fold(name, model, X_train, y_train, train_idx, val_idx):
+    """Fit one CV fold and score its validation part (same as cross_val_score)"""
+    started = time.time()
+    model = clone(model).fit(X_train[train_idx], y_train[train_idx])
+    output = {'model': model, 'score': model.score(X_train[val_idx], y_train[val_idx])}
+    return name, 'fold', output, (started, time.time())
+
+
+def train_models_parallel(models, X_train, X_test, y_train, y_test, cv=5, n_jobs=-1,
+                          zero_division='warn', refit=False):
+    """Train and cross-validate all models concurrently
+
+    Every CV fold (and, with refit, every full fit) is an independent
+    task, so the pool stays busy even when one model (e.g. SVM) is much
+    slower than the rest. Without refit, each model's fold with the best
+    validation score is kept as its final model instead of fitting it
+    again; the other fold models are discarded. Returns (results,
+    wall_time): the same per-model dict as train_models() plus
+    'cv_scores' and 'wall_time' (seconds from the model's first task
+    starting to its last one finishing), and the total elapsed time.
+    """
+    X_train = np.asarray(X_train)
+    X_test = np.asarray(X_test)
+    y_train = np.asarray(y_train)
+    y_test = np.asarray(y_test)
+
+    # cross_val_score(cv=int) uses unshuffled stratified folds for classifiers
+    folds = list(StratifiedKFold(n_splits=cv).split(X_train, y_train))
+
+    tasks = []
+    for name, model in models.items():
+        if refit:
+            tasks.append(delayed(_fit_full)(name, model, X_train, X_test, y_train, y_test, zero_division))
+        for train_idx, val_idx in folds:
+            tasks.append(delayed(_fit_fold)(name, model, X_train, y_train, train_idx, val_idx))
+
+    start = time.perf_counter()
+    outputs = Parallel(n_jobs=n_jobs)(tasks)
+    wall_time = time.perf_counter() - start
+
+    results = {name: {'cv_scores': []} for name in models}
+    spans = {name: [] for name in models}
+    best_folds = {}
+    for name, kind, output, span in outputs:
+        spans[name].append(span)
+        if kind == 'full':
+            results[name].update(output)
+            continue
+        results[name]['cv_scores'].append(output['score'])
+        if name not in best_folds or output['score'] > best_folds[name]['score']:
+            best_folds[name] = output
+
+    for name, result in results.items():
+        if not refit:
+            result.update(_evaluate(best_folds[name]['model'], X_test, y_test, zero_division))
+        result['cv_score'] = float(np.mean(result['cv_scores']))
+        # Wall-clock on the shared system clock, since the tasks ran in other processes
+        result['wall_time'] = max(end for _, end in spans[name]) - min(begin for begin, _ in spans[name])
+
+    return results, wall_time
@@ -0,0 +1,289 @@
+"""
+Compiled Tree Ensembles
+Flatten fitted trees into contiguous NumPy arrays and score them vectorized
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy.special import expit
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+# (row, tree) pairs walked per block, sized to stay in cache
+BLOCK_PAIRS = 1 << 15
+
+# Batch sizes timed to find where sklearn overtakes the compiled walk
+CROSSOVER_SIZES = (16, 32, 64, 128, 256, 512, 1024)
+
+
+def _float32_floor(threshold):
+    """Largest float32 <= each threshold
+
+    Trees compare float32 features against float64 thresholds; for a
+    float32 x, x <= t exactly when x <= _float32_floor(t), so the walk can
+    stay in float32 without changing a single decision.
+    """
+    rounded = threshold.astype(np.float32)
+    over = rounded.astype(np.float64) > threshold
+    rounded[over] = np.nextafter(rounded[over], np.float32(-np.inf))
+    return rounded
+
+
+class CompiledTrees:
+    """All trees of a model as one set of flat node arrays
+
+    feature, threshold, left, right and value are indexed by global node
+    id; roots holds the id of each tree's root. Leaves point to themselves,
+    so every row can take max_depth steps without checking for leaves.
+
+    kind is 'tree', 'forest' or 'boosting'. For 'tree' and 'forest', value
+    is the positive-class fraction of each node; for 'boosting' it is the
+    regression value and scores are expit(init_raw + learning_rate * sum).
+    """
+
+    def __init__(self, kind, feature, threshold, left, right, value, roots, max_depth,
+                 learning_rate=1.0, init_raw=0.0):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.learning_rate = float(learning_rate)
+        self.init_raw = float(init_raw)
+
+        # Walk tables: children interleaved so the next node is one lookup
+        self._feature = feature.astype(np.intp)
+        self._threshold = _float32_floor(threshold)
+        self._children = np.column_stack([left, right]).ravel().astype(np.intp)
+        self._roots = roots.astype(np.intp)
+
+    @classmethod
+    def from_tables(cls, kind, feature, threshold, children, value, roots, max_depth,
+                    learning_rate=1.0, init_raw=0.0):
+        """CompiledTrees over existing walk tables, used as they are (no copies)
+
+        For memory-mapped tables from tables(): feature, children and roots
+        must be intp and threshold the float32 floors. threshold, left and
+        right are then float32 and views of the tables.
+        """
+        self = cls.__new__(cls)
+        self.kind = kind
+        self.feature = self._feature = feature
+        self.threshold = self._threshold = threshold
+        self.left = children[0::2]
+        self.right = children[1::2]
+        self.value = value
+        self.roots = self._roots = roots
+        self._children = children
+        self.max_depth = int(max_depth)
+        self.learning_rate = float(learning_rate)
+        self.init_raw = float(init_raw)
+        return self
+
+    def tables(self):
+        """The arrays the walk reads, for from_tables()"""
+        return {'feature': self._feature, 'threshold': self._threshold, 'children': self._children,
+                'value': self.value, 'roots': self._roots}
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """(n_rows, n_trees) global id of the leaf each row reaches in each tree"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        leaves = np.empty((n_rows, self.n_trees), dtype=np.intp)
+        step = max(1, BLOCK_PAIRS // self.n_trees)
+        for start in range(0, n_rows, step):
+            block = X[start:start + step]
+            flat = block.ravel()
+            offsets = (np.arange(len(block), dtype=np.intp) * n_features)[:, None]
+            nodes = np.broadcast_to(self._roots, (len(block), self.n_trees))
+            # Move every (row, tree) pair down one level at a time
+            for _ in range(self.max_depth):
+                go_right = flat[offsets + self._feature[nodes]] > self._threshold[nodes]
+                nodes = self._children[2 * nodes + go_right]
+            leaves[start:start + step] = nodes
+        return leaves
+
+    def predict_proba(self, X):
+        """Positive-class probability for each row of a 2-D float array
+
+        Per-tree values are summed in estimator order with a cumulative sum
+        (strictly sequential, unlike sum's pairwise reduction), as sklearn
+        does, so results match predict_proba exactly.
+        """
+        values = self.value[self.apply(X)]  # (n_rows, n_trees)
+        if self.kind == 'tree':
+            return values[:, 0]
+        if self.kind == 'forest':
+            return np.cumsum(values, axis=1)[:, -1] / self.n_trees
+        terms = np.empty((len(values), self.n_trees + 1))
+        terms[:, 0] = self.init_raw
+        np.multiply(self.learning_rate, values, out=terms[:, 1:])
+        return expit(np.cumsum(terms, axis=1)[:, -1])
+
+
+def _flatten(trees, node_value):
+    """Concatenate sklearn Tree objects into global node arrays"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        n = tree.node_count
+        ids = np.arange(offset, offset + n)
+        leaf = tree.children_left == -1
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(np.where(leaf, ids, tree.children_left + offset))
+        rights.append(np.where(leaf, ids, tree.children_right + offset))
+        values.append(node_value(tree))
+        roots.append(offset)
+        offset += n
+    return (np.concatenate(features).astype(np.intp), np.concatenate(thresholds),
+            np.concatenate(lefts).astype(np.intp), np.concatenate(rights).astype(np.intp),
+            np.concatenate(values), np.array(roots, dtype=np.intp),
+            max(tree.max_depth for tree in trees))
+
+
+def _class_fraction(tree):
+    # Same normalization as DecisionTreeClassifier.predict_proba
+    counts = tree.value[:, 0, :]
+    normalizer = counts.sum(axis=1)
+    normalizer[normalizer == 0.0] = 1.0
+    return counts[:, 1] / normalizer
+
+
+def _regression_value(tree):
+    return tree.value[:, 0, 0]
+
+
+def compile_model(model):
+    """CompiledTrees for a binary tree-based classifier, or None if unsupported"""
+    # Tree models loaded from a safe artifact are compiled already
+    # (duck-typed: under `python tree_compiler.py` this module's classes are __main__'s)
+    if hasattr(model, 'compiled'):
+        return model.compiled
+    if len(getattr(model, 'classes_', ())) != 2:
+        return None
+
+    if isinstance(model, DecisionTreeClassifier):
+        return CompiledTrees('tree', *_flatten([model.tree_], _class_fraction))
+
+    if isinstance(model, RandomForestClassifier):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        return CompiledTrees('forest', *_flatten(trees, _class_fraction))
+
+    if isinstance(model, GradientBoostingClassifier):
+        # Only constant initial predictions (prior or zero) can be precomputed
+        if not (model.init_ == 'zero' or isinstance(model.init_, DummyClassifier)):
+            return None
+        init_raw = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0, 0]
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        return CompiledTrees('boosting', *_flatten(trees, _regression_value),
+                             learning_rate=model.learning_rate, init_raw=init_raw)
+
+    return None
+
+
+def max_abs_diff(compiled, model, X):
+    """Largest difference from model.predict_proba on X (0.0 means bit-identical)"""
+    expected = model.predict_proba(np.asarray(X, dtype=np.float64))[:, 1]
+    return float(np.max(np.abs(compiled.predict_proba(X) - expected)))
+
+
+def _best_seconds(fn, X, repeats=5):
+    fn(X)  # warm up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def crossover_rows(compiled, model, X):
+    """Largest batch in CROSSOVER_SIZES the compiled walk scores at least as fast as sklearn
+
+    0 when sklearn is faster even on the smallest batch. Rows of X are
+    repeated to fill the larger batches.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rows = 0
+    for size in CROSSOVER_SIZES:
+        batch = np.resize(X, (size, X.shape[1]))
+        if _best_seconds(compiled.predict_proba, batch) > _best_seconds(model.predict_proba, batch):
+            break
+        rows = size
+    return rows
+
+
+def check_compiled(model, X_check):
+    """Compile a tree-based model and verify it on X_check
+
+    Returns {'n_trees', 'max_abs_diff', 'max_rows'} for model_info, or None
+    when the model has no trees to compile. max_rows is the measured
+    crossover (see crossover_rows) that FastPredictor uses as its cutoff.
+    The arrays themselves are stored in the safe artifact (see
+    safe_artifact.py).
+    """
+    compiled = compile_model(model)
+    if compiled is None:
+        return None
+    return {'n_trees': compiled.n_trees, 'max_abs_diff': max_abs_diff(compiled, model, X_check),
+            'max_rows': crossover_rows(compiled, model, X_check)}
+
+
+def _rows_per_second(fn, X, min_seconds=0.2):
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        fn(X)
+        calls += 1
+    return calls * len(X) / (time.perf_counter() - start)
+
+
+def main():
+    """Check and benchmark the compiled evaluator against sklearn"""
+    from fast_predictor import FastPredictor
+    from inference import load_artifacts, load_manifest, load_pipeline
+
+    parser = argparse.ArgumentParser(description="Compare compiled trees with sklearn predict_proba")
+    parser.add_argument('--rows', type=int, default=50000, help="Rows in the largest benchmark batch")
+    args = parser.parse_args()
+
+    model, scaler, model_info = load_artifacts()
+    if model is None:
+        print("Model not found! Please run 'train_model.py' first.")
+        return
+    model = FastPredictor(model, scaler).model
+    compiled = compile_model(model)
+    if compiled is None:
+        print(f"{model_info['model_name']} is not a tree-based model; nothing to compile.")
+        return
+    if compiled is getattr(model, 'compiled', None):
+        # Loaded from the safe artifact: compare with the pickled sklearn model it was written from
+        model = FastPredictor(*load_pipeline(load_manifest(), safe=False)[:2]).model
+
+    X = np.random.default_rng(42).normal(size=(args.rows, model.n_features_in_))
+    print(f"Model: {model_info['model_name']} ({compiled.n_trees} trees, "
+          f"{len(compiled.feature)} nodes, depth {compiled.max_depth})")
+    print(f"Max |compiled - predict_proba|: {max_abs_diff(compiled, model, X):.3g}")
+
+    print(f"  {'batch':>7s} {'sklearn rows/s':>16s} {'compiled rows/s':>16s}")
+    for batch_size in sorted({1, 8, 64, 512, args.rows}):
+        batch = X[:batch_size]
+        baseline = _rows_per_second(model.predict_proba, batch)
+        fast = _rows_per_second(compiled.predict_proba, batch)
+        print(f"  {batch_size:7d} {baseline:16,.0f} {fast:16,.0f}  {fast / baseline:5.1f}x")
+    print(f"Compiled trees are faster up to {crossover_rows(compiled, model, X)} rows per batch")
+
+
+if __name__ == "__main__":
+    main()
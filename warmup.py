@@ -0,0 +1,97 @@
+"""
+Model Warm-Up
+Load, validate and exercise the model in the background at start-up
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from inference import ArtifactError, dummy_rows
+from instrumentation import timer
+
+# Enough rows to run both the compiled-tree and the sklearn batch paths
+WARMUP_BATCH_ROWS = 128
+WARMUP_SINGLE_ROWS = 16
+
+
+def _check(predictions, probabilities):
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    if not np.all(np.isfinite(probabilities)) or probabilities.min() < 0 or probabilities.max() > 1:
+        raise ArtifactError("Model produced probabilities outside [0, 1] during warm-up")
+    if not set(np.asarray(predictions).tolist()) <= {0, 1}:
+        raise ArtifactError("Model produced labels other than 0 and 1 during warm-up")
+
+
+def warm_up(version, batch_rows=WARMUP_BATCH_ROWS, single_rows=WARMUP_SINGLE_ROWS):
+    """Run dummy predictions through every path a request can take
+
+    Single rows, a batch and the micro-batcher are each exercised once so
+    lazy imports, compiled trees, thread-local buffers and the batcher's
+    worker are all in place; results are checked for sane values.
+    """
+    rows = dummy_rows(batch_rows)
+    for row in rows[:single_rows]:
+        prediction, probability = version.predictor.predict_row(row)
+        _check([prediction], [probability])
+    _check(*version.predictor.predict(rows))
+    prediction, probability = version.batcher.predict(rows[0])
+    _check([prediction], [probability])
+
+
+class Warmup:
+    """Builds the model registry on a background thread and warms it up
+
+    ready is set once the registry exists and warm-up has finished (or
+    failed; see error). registry() waits for it, so requests that arrive
+    early block until the model is usable instead of loading it again.
+    prime callables run after ready is set, for other first-use costs such
+    as building the first plotly figure, so nobody waits on them.
+    """
+
+    def __init__(self, factory, prime=()):
+        self.factory = factory
+        self.prime = prime
+        self.ready = threading.Event()
+        self.error = None
+        self.prime_error = None
+        self.seconds = None
+        self._registry = None
+        self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            with timer('warmup'):
+                registry = self.factory()
+                self._registry = registry
+                version = registry.current()
+                if version is None:
+                    raise FileNotFoundError("Model not found! Please run 'train_model.py' first.")
+                warm_up(version)
+        except Exception as e:  # reported through status(); the registry may still serve
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.seconds = time.perf_counter() - start
+            self.ready.set()
+        try:
+            for prime in self.prime:
+                prime()
+        except Exception as e:  # priming is best effort
+            self.prime_error = f"{type(e).__name__}: {e}"
+
+    def registry(self, timeout=None):
+        """The warmed-up ModelRegistry, waiting for warm-up; None if it could not be built"""
+        self.ready.wait(timeout)
+        return self._registry
+
+    def status(self):
+        """Readiness for health checks"""
+        return {
+            'ready': self.ready.is_set() and self.error is None,
+            'warming_up': not self.ready.is_set(),
+            'warmup_seconds': self.seconds,
+            'error': self.error,
+        }